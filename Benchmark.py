@@ -0,0 +1,279 @@
+import argparse  # Importar argparse para los argumentos del subcomando
+import csv  # Importar csv para el reporte tabular
+import json  # Importar json para el reporte completo
+import multiprocessing as mp  # Importar multiprocessing para conocer el número de núcleos
+import os  # Importar os para crear carpetas
+import platform  # Importar platform para registrar el entorno de la prueba
+import statistics  # Importar statistics para la mediana y la desviación estándar
+import time  # Importar time para medir con perf_counter
+import numpy as np  # Importar numpy para operaciones numéricas
+from mpi4py import MPI  # Importar MPI para el backend distribuido
+from MPI import paralelizarMpiDotplot  # Backend MPI
+from Multiprocessing import paralelizarMultiprocessingDotplot, DotplotCompartido, crearPoolMultiprocessing, paralelizarMultiprocessingCompartido  # Backends multiprocessing
+from Secuencial import sequentialDotplot  # Backend secuencial (línea base)
+from Hilos import paralelizarHilosDotplot  # Backend de hilos
+from Kmer import kmerDotplot  # Backend disperso por k-mers
+from Empaquetado import DotplotEmpaquetado  # Para sincronizar la salida empaquetada
+from Utilidades import activarModoHeadless, leerArchivoFasta, graficarDotplot, aplicarFiltroConvolucion  # Carga y renderizado
+from VistaGeneral import generarVistaGeneral  # Vista general que se dibuja al medir el renderizado
+import Perfilado  # Para apagar las barras de progreso durante las mediciones
+
+carpetaBenchmark = "ReporteTxt"  # Carpeta donde se guardan los reportes JSON/CSV
+carpetaImagenesBenchmark = "Imagenes/Benchmark"  # Carpeta de las imágenes generadas al medir el renderizado
+backendBase = "sequential"  # Backend contra el que se calculan aceleración y eficiencia
+
+# Función para ejecutar el backend secuencial
+def ejecutarSecuencial(secuencia1, secuencia2, numProcesadores, configuracion):
+    return sequentialDotplot(secuencia1, secuencia2, rutaSalida=configuracion["rutaSalida"], empaquetado=configuracion["empaquetado"])
+
+# Función para ejecutar el backend multiprocessing (un pool nuevo en cada llamada, como en Main)
+def ejecutarMultiprocessing(secuencia1, secuencia2, numProcesadores, configuracion):
+    return paralelizarMultiprocessingDotplot(secuencia1, secuencia2, numProcesadores=numProcesadores,
+                                             rutaSalida=configuracion["rutaSalida"], empaquetado=configuracion["empaquetado"])
+
+# Función para ejecutar el backend de hilos
+def ejecutarHilos(secuencia1, secuencia2, numProcesadores, configuracion):
+    return paralelizarHilosDotplot(secuencia1, secuencia2, numHilos=numProcesadores,
+                                   rutaSalida=configuracion["rutaSalida"], empaquetado=configuracion["empaquetado"])
+
+# Función para preparar el backend de memoria compartida fuera de la medición, como en Main:
+# la memoria compartida se crea una vez por longitud y el pool una sola vez para todo el barrido
+def prepararMemoriaCompartida(secuencia1, secuencia2, configuracion):
+    recursos = configuracion["recursos"]
+    if recursos.get("forma") != (len(secuencia1), len(secuencia2)):
+        liberarRecursos(configuracion)
+        recursos["forma"] = (len(secuencia1), len(secuencia2))
+        recursos["compartido"] = DotplotCompartido(secuencia1, secuencia2, rutaSalida=configuracion["rutaSalida"],
+                                                   empaquetado=configuracion["empaquetado"])
+    if recursos.get("pool") is None:
+        recursos["pool"] = crearPoolMultiprocessing(max(configuracion["numProcesos"]))
+
+# Función para ejecutar el backend de memoria compartida con los recursos ya preparados
+def ejecutarMemoriaCompartida(secuencia1, secuencia2, numProcesadores, configuracion):
+    recursos = configuracion["recursos"]
+    return paralelizarMultiprocessingCompartido(recursos["compartido"], recursos["pool"], numProcesadores=numProcesadores)
+
+# Función para ejecutar el backend MPI con los primeros numProcesadores procesos del comunicador
+def ejecutarMPI(secuencia1, secuencia2, numProcesadores, configuracion):
+    comm = configuracion["comm"]
+    subcomm = comm.Split(0 if comm.Get_rank() < numProcesadores else MPI.UNDEFINED, comm.Get_rank())
+    dotplot = None
+    if subcomm != MPI.COMM_NULL:
+        dotplot = paralelizarMpiDotplot(secuencia1, secuencia2, comm=subcomm, rutaSalida=configuracion["rutaSalida"],
+                                        empaquetado=configuracion["empaquetado"])
+        subcomm.Free()
+    return dotplot
+
+# Función para ejecutar el backend disperso por k-mers
+def ejecutarKmer(secuencia1, secuencia2, numProcesadores, configuracion):
+    return kmerDotplot(secuencia1, secuencia2, configuracion["kmer"])
+
+# Backends disponibles: función que lo ejecuta, si admite varios procesos y preparación que no se mide (o None)
+backendsBenchmark = {
+    "sequential": (ejecutarSecuencial, False, None),
+    "multiprocessing": (ejecutarMultiprocessing, True, None),
+    "threads": (ejecutarHilos, True, None),
+    "shared_memory": (ejecutarMemoriaCompartida, True, prepararMemoriaCompartida),
+    "mpi": (ejecutarMPI, True, None),
+    "kmer": (ejecutarKmer, False, None),
+}
+backendsColectivos = {"mpi"}  # Backends en los que participan todos los procesos MPI; el resto sólo corre en rank 0
+
+# Función para liberar el pool y la memoria compartida que haya creado un backend
+def liberarRecursos(configuracion):
+    recursos = configuracion["recursos"]
+    if recursos.get("compartido") is not None:
+        recursos["compartido"].liberar()
+    recursos.pop("compartido", None)
+    recursos.pop("forma", None)
+    if recursos.get("pool") is not None and configuracion.get("terminado"):
+        recursos["pool"].close()
+        recursos["pool"].join()
+        recursos.pop("pool")
+
+# Función para asegurar que el dotplot escrito en un .npy llegó al disco (es la parte de E/S de la medición)
+def sincronizarSalida(dotplot):
+    if isinstance(dotplot, DotplotEmpaquetado):
+        dotplot = dotplot.bits
+    if isinstance(dotplot, np.memmap) and dotplot.flags.writeable:
+        dotplot.flush()
+
+# Función para renderizar el dotplot como en Main: vista general completa y filtro de diagonales sobre el recorte
+def renderizarDotplot(dotplot, nombre):
+    graficarDotplot(generarVistaGeneral(dotplot), figNombre=f"{carpetaImagenesBenchmark}/{nombre}.png")
+    aplicarFiltroConvolucion(dotplot[:2000, :2000], f"{carpetaImagenesBenchmark}/{nombre}_filtrado.png")
+
+# Función para medir una configuración: calentamiento sin registrar y luego repeticiones con cómputo, E/S y renderizado por separado
+def medirConfiguracion(backend, secuencia1, secuencia2, numProcesadores, configuracion):
+    comm = configuracion["comm"]
+    ejecutar, _, preparar = backendsBenchmark[backend]
+    colectivo = backend in backendsColectivos
+    if preparar is not None:
+        preparar(secuencia1, secuencia2, configuracion)
+    mediciones = []
+    for repeticion in range(configuracion["calentamiento"] + configuracion["repeticiones"]):
+        if colectivo:
+            comm.Barrier()  # Todos los procesos empiezan juntos
+        inicio = time.perf_counter()
+        dotplot = ejecutar(secuencia1, secuencia2, numProcesadores, configuracion)
+        if colectivo:
+            comm.Barrier()  # El cómputo termina cuando termina el último proceso
+        computo = time.perf_counter() - inicio
+
+        # E/S y renderizado sólo en el proceso que tiene el dotplot completo
+        entradaSalida = renderizado = 0.0
+        if dotplot is not None:
+            inicio = time.perf_counter()
+            sincronizarSalida(dotplot)
+            entradaSalida = time.perf_counter() - inicio
+            if configuracion["renderizar"]:
+                inicio = time.perf_counter()
+                renderizarDotplot(dotplot, f"{backend}_{numProcesadores}_{len(secuencia1)}")
+                renderizado = time.perf_counter() - inicio
+        del dotplot
+
+        if repeticion >= configuracion["calentamiento"]:
+            mediciones.append({"computo": computo, "entradaSalida": entradaSalida, "renderizado": renderizado})
+    return mediciones
+
+# Función para resumir una lista de tiempos con mediana, desviación estándar, mínimo y media
+def resumirTiempos(tiempos):
+    return {
+        "mediana": statistics.median(tiempos),
+        "desviacion": statistics.stdev(tiempos) if len(tiempos) > 1 else 0.0,
+        "minimo": min(tiempos),
+        "media": statistics.mean(tiempos),
+    }
+
+# Función para calcular aceleración y eficiencia de cada resultado contra la línea base secuencial de la misma longitud
+def calcularAceleraciones(resultados):
+    lineaBase = {resultado["longitud"]: resultado["computo"]["mediana"]
+                 for resultado in resultados if resultado["backend"] == backendBase}
+    for resultado in resultados:
+        base = lineaBase.get(resultado["longitud"])
+        mediana = resultado["computo"]["mediana"]
+        resultado["aceleracion"] = base / mediana if base is not None and mediana > 0 else None
+        resultado["eficiencia"] = resultado["aceleracion"] / resultado["procesos"] if resultado["aceleracion"] is not None else None
+
+# Función para guardar los resultados en JSON (con las mediciones crudas) y en CSV (sólo el resumen)
+def guardarResultadosBenchmark(metadatos, resultados):
+    os.makedirs(carpetaBenchmark, exist_ok=True)
+    marcaTiempo = time.strftime("%Y%m%d_%H%M%S")
+    rutaJson = os.path.join(carpetaBenchmark, f"benchmark_{marcaTiempo}.json")
+    rutaCsv = os.path.join(carpetaBenchmark, f"benchmark_{marcaTiempo}.csv")
+
+    with open(rutaJson, "w") as archivo:
+        json.dump({"metadatos": metadatos, "resultados": resultados}, archivo, indent=2)
+
+    columnas = ["backend", "procesos", "longitud", "repeticiones"]
+    columnas += [f"{medida}{estadistico}" for medida in ("computo", "entradaSalida", "renderizado")
+                 for estadistico in ("Mediana", "Desviacion", "Minimo")]
+    columnas += ["aceleracion", "eficiencia"]
+    with open(rutaCsv, "w", newline="") as archivo:
+        escritor = csv.DictWriter(archivo, fieldnames=columnas)
+        escritor.writeheader()
+        for resultado in resultados:
+            fila = {columna: resultado.get(columna) for columna in ("backend", "procesos", "longitud", "aceleracion", "eficiencia")}
+            fila["repeticiones"] = len(resultado["mediciones"])
+            for medida in ("computo", "entradaSalida", "renderizado"):
+                fila[f"{medida}Mediana"] = resultado[medida]["mediana"]
+                fila[f"{medida}Desviacion"] = resultado[medida]["desviacion"]
+                fila[f"{medida}Minimo"] = resultado[medida]["minimo"]
+            escritor.writerow(fila)
+    return rutaJson, rutaCsv
+
+# Función para leer los argumentos del subcomando benchmark
+def leerArgumentosBenchmark(argumentos):
+    parser = argparse.ArgumentParser(prog="Main.py benchmark",
+                                     description="Barrido de backends x número de procesos x longitud de las secuencias")
+    parser.add_argument('--file1', dest='archivo1', type=str, required=True, help='Archivo 1 de secuencia en formato FASTA')
+    parser.add_argument('--file2', dest='archivo2', type=str, required=True, help='Archivo 2 de secuencia en formato FASTA')
+    parser.add_argument('--backends', nargs='+', default=["sequential", "multiprocessing"], choices=sorted(backendsBenchmark),
+                        help='Backends a medir (el secuencial siempre se mide como línea base)')
+    parser.add_argument('--num_processes', dest='numProcesos', type=int, nargs='+', default=[1, 2, 4], help='Número de procesos a probar')
+    parser.add_argument('--lengths', dest='longitudes', type=int, nargs='+', default=[2000, 5000, 10000], help='Longitudes de las secuencias a probar')
+    parser.add_argument('--warmup', dest='calentamiento', type=int, default=1, help='Ejecuciones de calentamiento que no se registran')
+    parser.add_argument('--repeats', dest='repeticiones', type=int, default=5, help='Repeticiones medidas por configuración')
+    parser.add_argument('--kmer', dest='kmer', type=int, default=12, help='Tamaño de k-mer para el backend kmer')
+    parser.add_argument('--output', dest='rutaSalida', type=str, default=None, help='Archivo .npy donde escribir el dotplot (mide también la E/S)')
+    parser.add_argument('--packed', action='store_true', help='Guardar el dotplot empaquetado en bits')
+    parser.add_argument('--render', dest='renderizar', action='store_true', help='Medir también el renderizado de la vista general y el filtro')
+    args = parser.parse_args(argumentos)
+    if args.repeticiones < 1:
+        parser.error("--repeats debe ser al menos 1")
+    return args
+
+# Función principal del subcomando benchmark: python Main.py benchmark --file1=... --file2=... [opciones]
+def ejecutarBenchmark(argumentos, comm=MPI.COMM_WORLD):
+    args = leerArgumentosBenchmark(argumentos)
+    rank, size = comm.Get_rank(), comm.Get_size()
+    activarModoHeadless()  # Sin ventanas: nada debe esperar al usuario dentro de la medición
+    Perfilado.mostrarProgreso = False  # Las barras de progreso no deben sumar su costo a los tiempos
+
+    # Cargar las secuencias una sola vez (rank 0) y medir la carga aparte
+    secuenciaTotal1 = secuenciaTotal2 = None
+    tiemposCarga = {}
+    if rank == 0:
+        inicio = time.perf_counter()
+        secuenciaTotal1 = leerArchivoFasta(args.archivo1)
+        secuenciaTotal2 = leerArchivoFasta(args.archivo2)
+        tiemposCarga["cargaArchivos"] = time.perf_counter() - inicio
+    longitudMaxima = comm.bcast(min(len(secuenciaTotal1), len(secuenciaTotal2)) if rank == 0 else None, root=0)
+    longitudes = sorted({min(longitud, longitudMaxima) for longitud in args.longitudes})
+
+    # El secuencial va primero: es la línea base de aceleración y eficiencia
+    backends = [backendBase] + [backend for backend in dict.fromkeys(args.backends) if backend != backendBase]
+    configuracion = {"comm": comm, "rutaSalida": args.rutaSalida, "empaquetado": args.packed, "kmer": args.kmer,
+                     "calentamiento": args.calentamiento, "repeticiones": args.repeticiones, "renderizar": args.renderizar,
+                     "numProcesos": args.numProcesos, "recursos": {}}
+
+    resultados = []
+    for longitud in longitudes:
+        secuencia1 = secuenciaTotal1[:longitud] if rank == 0 else None
+        secuencia2 = secuenciaTotal2[:longitud] if rank == 0 else None
+        for backend in backends:
+            procesos = sorted(set(args.numProcesos)) if backendsBenchmark[backend][1] else [1]
+            for numProcesadores in procesos:
+                if backend in backendsColectivos and numProcesadores > size:
+                    if rank == 0:
+                        print(f"Se omite {backend} con {numProcesadores} procesos: mpiexec se lanzó con {size}")
+                    continue
+                if backend not in backendsColectivos and rank != 0:
+                    continue  # Los demás procesos no participan en los backends locales
+                if rank == 0:
+                    print(f"Midiendo {backend} con {numProcesadores} procesos y longitud {longitud}")
+                mediciones = medirConfiguracion(backend, secuencia1, secuencia2, numProcesadores, configuracion)
+                if rank == 0:
+                    resultado = {"backend": backend, "procesos": numProcesadores, "longitud": longitud, "mediciones": mediciones}
+                    for medida in ("computo", "entradaSalida", "renderizado"):
+                        resultado[medida] = resumirTiempos([medicion[medida] for medicion in mediciones])
+                    resultados.append(resultado)
+        liberarRecursos(configuracion)  # La memoria compartida depende de la longitud
+        comm.Barrier()
+    configuracion["terminado"] = True
+    liberarRecursos(configuracion)
+
+    if rank != 0:
+        return None
+    calcularAceleraciones(resultados)
+    metadatos = {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "argumentos": vars(args),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "nucleos": mp.cpu_count(),
+        "procesosMPI": size,
+        **tiemposCarga,
+    }
+    rutaJson, rutaCsv = guardarResultadosBenchmark(metadatos, resultados)
+
+    # Resumen por consola
+    for resultado in resultados:
+        aceleracionTexto = f"{resultado['aceleracion']:.2f}" if resultado["aceleracion"] is not None else "-"
+        print(f"{resultado['backend']:>16} p={resultado['procesos']:<3} n={resultado['longitud']:<8} "
+              f"cómputo={resultado['computo']['mediana']:.4f}s ±{resultado['computo']['desviacion']:.4f} "
+              f"E/S={resultado['entradaSalida']['mediana']:.4f}s render={resultado['renderizado']['mediana']:.4f}s "
+              f"aceleración={aceleracionTexto}")
+    print(f"Resultados guardados en {rutaJson} y {rutaCsv}")
+    return resultados
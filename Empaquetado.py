@@ -0,0 +1,77 @@
+import numpy as np  # Importar numpy para operaciones numéricas
+
+# Función para calcular cuántos bytes ocupan numColumnas bits empaquetados
+def columnasEmpaquetadas(numColumnas):
+    return (numColumnas + 7) // 8
+
+# Función para empaquetar un bloque de coincidencias (bool o 0/1) en bits, 8 columnas por byte
+def empaquetarBloque(coincidencias, salida=None):
+    bits = np.packbits(coincidencias, axis=1)
+    if salida is None:
+        return bits
+    salida[...] = bits
+    return salida
+
+# Función para desempaquetar la región [inicioFila, finFila) x [inicioColumna, finColumna) como uint8 0/1/2
+# La diagonal principal no se guarda: se deduce de los índices globales (i == j con coincidencia vale 2)
+def desempaquetarRegion(bits, inicioFila, finFila, inicioColumna, finColumna):
+    byteInicio, byteFin = inicioColumna // 8, columnasEmpaquetadas(finColumna)
+    region = np.unpackbits(np.asarray(bits[inicioFila:finFila, byteInicio:byteFin]), axis=1)
+    region = region[:, inicioColumna - byteInicio * 8:finColumna - byteInicio * 8]
+
+    inicioDiagonal = max(inicioFila, inicioColumna)
+    finDiagonal = min(finFila, finColumna)
+    if inicioDiagonal < finDiagonal:
+        indices = np.arange(inicioDiagonal, finDiagonal)
+        region[indices - inicioFila, indices - inicioColumna] *= np.uint8(2)  # 1 -> 2, 0 se mantiene
+    return region
+
+# Función para traducir el índice de un eje (entero o slice, como en numpy) a la región contigua [inicio, fin) que lo cubre
+# y al paso que hay que aplicar sobre esa región; los índices negativos cuentan desde el final y los pasos negativos invierten el eje
+def regionIndice(indice, longitud):
+    if isinstance(indice, (int, np.integer)):
+        posicion = int(indice) + longitud if indice < 0 else int(indice)
+        if not 0 <= posicion < longitud:
+            raise IndexError(f"Índice {indice} fuera de rango para un eje de tamaño {longitud}")
+        return posicion, posicion + 1, slice(None)
+    if not isinstance(indice, slice):
+        raise TypeError(f"Sólo se admiten enteros y slices como índices, no {type(indice).__name__}")
+    rango = range(*indice.indices(longitud))
+    if len(rango) == 0:
+        return 0, 0, slice(None)
+    # Con paso negativo la región se recorre desde su último elemento, que es justamente rango[0]
+    return min(rango[0], rango[-1]), max(rango[0], rango[-1]) + 1, slice(None, None, rango.step)
+
+# Función para normalizar los índices de dotplot[filas, columnas] en regiones de ambos ejes
+def regionesIndices(indices, forma):
+    if not isinstance(indices, tuple):
+        indices = (indices, slice(None))
+    if len(indices) != 2:
+        raise IndexError(f"El dotplot tiene 2 dimensiones pero se indexó con {len(indices)}")
+    return indices, regionIndice(indices[0], forma[0]), regionIndice(indices[1], forma[1])
+
+# Clase que representa un dotplot guardado como bits empaquetados (1 bit por celda en lugar de 1 byte)
+# Se indexa como la matriz densa: dotplot[:2000, :2000] desempaqueta sólo esa región
+class DotplotEmpaquetado:
+    def __init__(self, bits, numColumnas):
+        self.bits = bits  # Arreglo (filas, ceil(columnas / 8)) en memoria, memoria compartida o memmap
+        self.shape = (bits.shape[0], numColumnas)
+        self.dtype = np.dtype(np.uint8)
+        self.ndim = 2
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, indices):
+        indices, (inicioFila, finFila, pasoFila), (inicioColumna, finColumna, pasoColumna) = regionesIndices(indices, self.shape)
+        region = desempaquetarRegion(self.bits, inicioFila, finFila, inicioColumna, finColumna)
+        region = region[pasoFila, pasoColumna]
+        # Los índices enteros eliminan su eje, igual que en numpy
+        if isinstance(indices[1], (int, np.integer)):
+            region = region[:, 0]
+        if isinstance(indices[0], (int, np.integer)):
+            region = region[0]
+        return region
+
+    def __repr__(self):
+        return f"DotplotEmpaquetado(forma={self.shape}, bytes={self.bits.nbytes})"
@@ -0,0 +1,163 @@
+import multiprocessing as mp  # Importar multiprocessing para la programación paralela
+import os  # Importar os para la ruta del resultado filtrado
+import numpy as np  # Importar numpy para operaciones numéricas
+import cv2  # Importar OpenCV para guardar la imagen
+import time  # Importar time para medir tiempos de ejecución
+import Perfilado  # Para consultar si la traza está activa
+from Perfilado import barraProgreso, medirTramo, activarTraza, recogerEventos, agregarEventos  # Barra de progreso y tramos de la traza
+from Empaquetado import DotplotEmpaquetado  # Dotplot empaquetado en bits
+from Utilidades import aplicarFiltroConvolucion, guardarResultadosArchivo, resultadosGenerarImagenes  # Filtro original y reportes
+from VistaGeneral import generarVistaGeneral  # Vista general para imágenes demasiado grandes
+
+tamanoTeselaFiltro = 2048  # Lado de cada tesela del filtro (sin contar el halo)
+celdasMaximasImagen = 64 * 2**20  # Por encima de este tamaño se guarda la vista general en lugar de la imagen completa
+valorDelUmbral = 70  # Umbral sobre la matriz normalizada a [0, 127], igual que en aplicarFiltroConvolucion
+
+fuenteFiltro = None  # Dotplot que cada worker abre una sola vez cuando está en disco
+salidaFiltro = None  # Memmap de salida del worker cuando el resultado se escribe en disco
+
+# Función para describir cómo un worker puede leer el dotplot por su cuenta (sólo si está completo en un archivo .npy)
+def describirFuente(dotplot):
+    if isinstance(dotplot, DotplotEmpaquetado):
+        descriptor = describirFuente(dotplot.bits)
+        return ("empaquetado", descriptor[1], dotplot.shape[1]) if descriptor is not None else None
+    if isinstance(dotplot, np.memmap) and dotplot.filename is not None and dotplot.flags.c_contiguous:
+        # Un memmap contiguo con la misma forma que el archivo es el archivo completo y no un recorte
+        if np.load(dotplot.filename, mmap_mode="r").shape == dotplot.shape:
+            return ("archivo", dotplot.filename)
+    return None
+
+# Función para abrir en un worker el dotplot descrito por describirFuente
+def abrirFuente(descriptor):
+    if descriptor[0] == "empaquetado":
+        return DotplotEmpaquetado(np.load(descriptor[1], mmap_mode="r"), descriptor[2])
+    return np.load(descriptor[1], mmap_mode="r")
+
+# Función que inicializa cada worker del filtro con la fuente en disco y el archivo de salida, si existen
+def inicializarWorkerFiltro(descriptorFuente, rutaSalida, trazaActiva=False):
+    global fuenteFiltro, salidaFiltro
+    fuenteFiltro = abrirFuente(descriptorFuente) if descriptorFuente is not None else None
+    salidaFiltro = np.load(rutaSalida, mmap_mode="r+") if rutaSalida is not None else None
+    if trazaActiva:
+        activarTraza("worker filtro")
+
+# Función para calcular los índices con reflexión BORDER_REFLECT_101 (el borde por defecto de cv2.filter2D)
+def indicesReflejados(inicio, fin, tamano):
+    indices = np.arange(inicio - 1, fin + 1)
+    indices = np.abs(indices)
+    indices = np.where(indices >= tamano, 2 * tamano - 2 - indices, indices)
+    return np.clip(indices, 0, tamano - 1)
+
+# Función para leer una tesela con un halo de una celda (reflejado en los bordes de la región)
+def leerTeselaConHalo(dotplot, region, tesela):
+    inicioRegionFila, finRegionFila, inicioRegionColumna, finRegionColumna = region
+    inicioFila, finFila, inicioColumna, finColumna = tesela
+    filas = indicesReflejados(inicioFila, finFila, finRegionFila - inicioRegionFila) + inicioRegionFila
+    columnas = indicesReflejados(inicioColumna, finColumna, finRegionColumna - inicioRegionColumna) + inicioRegionColumna
+
+    # Leer sólo el rectángulo necesario y reordenarlo para aplicar la reflexión
+    bloque = np.asarray(dotplot[filas.min():filas.max() + 1, columnas.min():columnas.max() + 1], dtype=np.int16)
+    return bloque[np.ix_(filas - filas.min(), columnas - columnas.min())]
+
+# Función para aplicar el kernel de diagonales [[1,-1,-1],[-1,1,-1],[-1,-1,1]] a una tesela con halo
+# El kernel es 2 * identidad - unos, así que la respuesta es 2 * (suma diagonal) - (suma de la ventana 3x3)
+# El resultado se satura a [0, 255] como hace cv2.filter2D con uint8
+def filtrarTesela(bloqueConHalo):
+    diagonal = bloqueConHalo[:-2, :-2] + bloqueConHalo[1:-1, 1:-1] + bloqueConHalo[2:, 2:]
+    sumaFilas = bloqueConHalo[:, :-2] + bloqueConHalo[:, 1:-1] + bloqueConHalo[:, 2:]
+    ventana = sumaFilas[:-2] + sumaFilas[1:-1] + sumaFilas[2:]
+    return np.clip(2 * diagonal - ventana, 0, 255).astype(np.uint8)
+
+# Función para binarizar una tesela filtrada con el mínimo y máximo globales (cv2.normalize + cv2.threshold)
+def binarizarTesela(filtrada, minimo, maximo):
+    escala = 127.0 / (maximo - minimo) if maximo > minimo else 0.0
+    normalizada = np.rint((filtrada - float(minimo)) * escala)
+    return np.where(normalizada > valorDelUmbral, 255, 0).astype(np.uint8)
+
+# Función del primer pase: filtrar la tesela y devolver su mínimo y máximo
+def workerMinimoMaximo(args):
+    region, tesela, bloqueConHalo = args
+    with medirTramo("filtroTesela", pase=1, tesela=tesela):
+        if bloqueConHalo is None:
+            bloqueConHalo = leerTeselaConHalo(fuenteFiltro, region, tesela)
+        filtrada = filtrarTesela(bloqueConHalo)
+    return int(filtrada.min()), int(filtrada.max()), recogerEventos()
+
+# Función del segundo pase: volver a filtrar la tesela y binarizarla con los extremos globales
+def workerBinarizar(args):
+    region, tesela, bloqueConHalo, minimo, maximo = args
+    with medirTramo("filtroTesela", pase=2, tesela=tesela):
+        if bloqueConHalo is None:
+            bloqueConHalo = leerTeselaConHalo(fuenteFiltro, region, tesela)
+        binaria = binarizarTesela(filtrarTesela(bloqueConHalo), minimo, maximo)
+        if salidaFiltro is not None:
+            inicioFila, finFila, inicioColumna, finColumna = tesela
+            salidaFiltro[inicioFila:finFila, inicioColumna:finColumna] = binaria  # Se escribe directo en disco
+            binaria = None
+    return tesela, binaria, recogerEventos()
+
+# Función para generar las tareas de un pase; si los workers no pueden leer la fuente, la tesela viaja con su halo
+def generarTareas(dotplot, region, teselas, descriptorFuente, *extra):
+    for tesela in teselas:
+        bloqueConHalo = None if descriptorFuente is not None else leerTeselaConHalo(dotplot, region, tesela)
+        yield (region, tesela, bloqueConHalo) + extra
+
+# Función para aplicar el filtro de diagonales por teselas en paralelo sobre todo el dotplot (o sobre region)
+# Hace dos pases: el primero calcula el mínimo y máximo globales, el segundo normaliza y binariza con ellos,
+# así el resultado es el mismo que aplicarFiltroConvolucion sobre la matriz completa.
+# Acepta matrices en memoria, memmaps, DotplotEmpaquetado y DotplotDisperso; con rutaSalida el resultado va a un .npy.
+def aplicarFiltroConvolucionParalelo(dotplot, pathImagen=None, numProcesadores=mp.cpu_count(), rutaSalida=None,
+                                     region=None, tamanoTesela=tamanoTeselaFiltro):
+    inicioGenerarImagenes = time.time()  # Marca el inicio del tiempo de generación de imágenes
+    region = region if region is not None else (0, dotplot.shape[0], 0, dotplot.shape[1])
+    forma = (region[1] - region[0], region[3] - region[2])
+    teselas = [(inicioFila, min(inicioFila + tamanoTesela, forma[0]), inicioColumna, min(inicioColumna + tamanoTesela, forma[1]))
+               for inicioFila in range(0, forma[0], tamanoTesela)
+               for inicioColumna in range(0, forma[1], tamanoTesela)]
+
+    matrizBinaria = np.zeros(forma, dtype=np.uint8) if rutaSalida is None else \
+        np.lib.format.open_memmap(rutaSalida, mode="w+", dtype=np.uint8, shape=forma)
+    descriptorFuente = describirFuente(dotplot)
+    with mp.Pool(processes=numProcesadores, initializer=inicializarWorkerFiltro,
+                 initargs=(descriptorFuente, rutaSalida, Perfilado.trazaActiva)) as pool:
+        # Primer pase: mínimo y máximo globales de la matriz filtrada
+        extremos = list(barraProgreso(pool.imap_unordered(workerMinimoMaximo, generarTareas(dotplot, region, teselas, descriptorFuente)),
+                                      total=len(teselas)))
+        for extremo in extremos:
+            agregarEventos(extremo[2])
+        minimo = min(extremo[0] for extremo in extremos) if extremos else 0
+        maximo = max(extremo[1] for extremo in extremos) if extremos else 0
+
+        # Segundo pase: normalizar y binarizar cada tesela con los extremos globales
+        tareas = generarTareas(dotplot, region, teselas, descriptorFuente, minimo, maximo)
+        for (inicioFila, finFila, inicioColumna, finColumna), binaria, eventos in barraProgreso(pool.imap_unordered(workerBinarizar, tareas),
+                                                                                                total=len(teselas)):
+            agregarEventos(eventos)
+            if binaria is not None:
+                matrizBinaria[inicioFila:finFila, inicioColumna:finColumna] = binaria
+
+    # Guardar la matriz binarizada como imagen; si es demasiado grande, su vista general
+    if pathImagen is not None:
+        if matrizBinaria.size <= celdasMaximasImagen:
+            cv2.imwrite(pathImagen, np.asarray(matrizBinaria))
+        else:
+            cv2.imwrite(pathImagen, generarVistaGeneral(matrizBinaria).imagen)
+    resultadosGenerarImagenes.append(f"Tiempo de generación de la imagen filtrada en paralelo: {time.time() - inicioGenerarImagenes}")
+    guardarResultadosArchivo(resultadosGenerarImagenes, nombreArchivo="ReporteTxt/tiempoDeGeneracionDeImagenesMultip.txt")
+    return matrizBinaria
+
+# Función para calcular dónde guardar el resultado filtrado de un dotplot que está en disco: un .npy junto al original
+# Devuelve None si el dotplot está en memoria (el resultado filtrado ocupa lo mismo que él)
+def rutaFiltradoEnDisco(dotplot):
+    descriptor = describirFuente(dotplot)
+    return os.path.splitext(descriptor[1])[0] + "_filtrado.npy" if descriptor is not None else None
+
+# Función que aplica el filtro de diagonales: en paralelo sobre todo el dotplot si se indican procesos,
+# o como antes con aplicarFiltroConvolucion sobre el recorte [:recorte, :recorte]
+# Si el dotplot está en un .npy el resultado en paralelo se escribe en disco (dotplot_filtrado.npy) y no en la RAM
+def filtrarDotplot(dotplot, pathImagen, recorte=2000, numProcesadores=None):
+    with medirTramo("filtro", imagen=pathImagen):
+        if numProcesadores:
+            return aplicarFiltroConvolucionParalelo(dotplot, pathImagen, numProcesadores=numProcesadores,
+                                                    rutaSalida=rutaFiltradoEnDisco(dotplot))
+        return aplicarFiltroConvolucion(dotplot[:recorte, :recorte], pathImagen)
@@ -0,0 +1,67 @@
+import os  # Importar os para crear la carpeta de las gráficas
+import matplotlib.pyplot as plt  # Importar pyplot para graficar
+from concurrent.futures import ThreadPoolExecutor  # Importar el pool de hilos
+from Perfilado import barraProgreso  # Importar la barra de progreso
+from Kernel import codificarSecuencia, calcularBandaDotplot, dividirEnBloques, crearDotplotSalida, envolverDotplot  # Kernel vectorizado del dotplot
+from Utilidades import mostrarFigura  # Mostrar figuras respetando el modo headless
+from VistaGeneral import VistaGeneral  # Vista general acumulada mientras se calcula
+
+# Función para el trabajo de cada hilo: llenar la banda de filas [inicio, fin) directamente en la matriz compartida
+# Las comparaciones de numpy liberan el GIL, así que varios hilos calculan teselas a la vez sin copiar datos entre procesos
+def workerHilos(codigos1, codigos2, dotplot, inicio, fin, empaquetado, geometriaVista, ventanaDiagonal=None):
+    # Cada hilo acumula su propia vista parcial; combinarla en el hilo principal evita carreras en la vista general
+    vistaParcial = VistaGeneral(*geometriaVista, filas=(inicio, fin)) if geometriaVista is not None else None
+    calcularBandaDotplot(codigos1, codigos2, inicio, fin, dotplot[inicio:fin], empaquetado, vistaParcial, ventanaDiagonal)
+    return vistaParcial
+
+# Función para paralelizar el cálculo del dotplot con un pool de hilos que escriben en una única matriz preasignada
+# Con rutaSalida el dotplot se escribe en un archivo .npy mapeado en memoria en lugar de la RAM
+# Con empaquetado=True cada celda ocupa un bit y se devuelve un DotplotEmpaquetado
+# Con vistaGeneral cada hilo reduce sus teselas y la vista se completa a medida que terminan las bandas
+# Con ventanaDiagonal=(tamanoVentana, minimoCoincidencias) sólo se marcan las celdas cuya ventana diagonal supera el umbral
+def paralelizarHilosDotplot(secuencia1, secuencia2, numHilos=os.cpu_count(), rutaSalida=None, empaquetado=False, vistaGeneral=None,
+                            ventanaDiagonal=None):
+    # Codificar ambas secuencias una sola vez como arreglos uint8; todos los hilos las comparten
+    codigos1 = codificarSecuencia(secuencia1)
+    codigos2 = codificarSecuencia(secuencia2)
+
+    dotplot = crearDotplotSalida((len(codigos1), len(codigos2)), rutaSalida, empaquetado)  # Matriz (o memmap) para el dotplot completo
+    tarea = dividirEnBloques(0, len(codigos1))  # Una tarea por bloque de filas; las bandas no se solapan
+    geometriaVista = (vistaGeneral.forma, vistaGeneral.tamano) if vistaGeneral is not None else None
+    with ThreadPoolExecutor(max_workers=numHilos) as pool:  # Crear un pool de hilos
+        futuros = [pool.submit(workerHilos, codigos1, codigos2, dotplot, inicio, fin, empaquetado, geometriaVista, ventanaDiagonal)
+                   for inicio, fin in tarea]
+        for futuro in barraProgreso(futuros):
+            vistaParcial = futuro.result()  # Propaga cualquier excepción del hilo
+            if vistaParcial is not None:
+                vistaGeneral.combinar(vistaParcial)
+    return envolverDotplot(dotplot, len(codigos2), empaquetado)
+
+# Función para graficar el análisis de tiempos, aceleraciones y eficiencias usando hilos
+def graficarAnalisisHilos(tiempos, aceleraciones, eficiencias, numHilos):
+    print("Generando gráficas de Hilos...")  # Mensaje de estado
+    print(f"Tiempo: {tiempos} Aceleración: {aceleraciones} Eficiencia: {eficiencias} Número de hilos: {numHilos}")
+
+    # Configurar la figura
+    plt.figure(figsize=(10, 10))
+
+    # Subtrama 1: gráfico de tiempos vs número de hilos
+    plt.subplot(1, 2, 1)
+    plt.plot(numHilos, tiempos)
+    plt.xlabel("Número de hilos")
+    plt.ylabel("Tiempo")
+
+    # Subtrama 2: gráfico de aceleraciones y eficiencias vs número de hilos
+    plt.subplot(1, 2, 2)
+    plt.plot(numHilos, aceleraciones)
+    plt.plot(numHilos, eficiencias)
+    plt.xlabel("Número de hilos")
+    plt.ylabel("Aceleración y Eficiencia")
+    plt.legend(["Aceleración", "Eficiencia"])
+
+    # Guardar la figura como un archivo de imagen
+    os.makedirs("Imagenes/Hilos", exist_ok=True)
+    plt.savefig("Imagenes/Hilos/graficasHilos.png")
+
+    # Mostrar la figura en pantalla
+    mostrarFigura()
@@ -0,0 +1,122 @@
+import numpy as np  # Importar numpy para operaciones numéricas
+from Empaquetado import DotplotEmpaquetado, columnasEmpaquetadas, empaquetarBloque  # Almacenamiento en bits
+from Perfilado import medirTramo  # Tramos de la traza (sin costo si está desactivada)
+
+filasPorBloque = 256  # Número de filas que se comparan en cada bloque vectorizado
+columnasPorTesela = 4096  # Número de columnas de cada tesela 2D (múltiplo de 8 para poder empaquetar en bits)
+
+# Función para codificar una secuencia como un arreglo de códigos uint8 (un byte por carácter)
+# El tramo "codificacion" cubre también los arreglos: la secuencia de leerArchivoFasta es un memmap y copiarla lee el disco
+def codificarSecuencia(secuencia):
+    with medirTramo("codificacion", longitud=len(secuencia)):
+        if isinstance(secuencia, np.ndarray):
+            return np.ascontiguousarray(secuencia, dtype=np.uint8)  # Ya está codificada
+        if isinstance(secuencia, str):
+            secuencia = secuencia.encode("latin-1")  # Un byte por carácter
+        return np.frombuffer(secuencia, dtype=np.uint8)
+
+# Función para calcular un bloque del dotplot comparando por broadcasting
+# inicioFila/finFila e inicioColumna/finColumna son índices globales, así la diagonal principal queda bien marcada
+def calcularBloqueDotplot(codigos1, codigos2, inicioFila, finFila, inicioColumna=0, finColumna=None, salida=None):
+    if finColumna is None:
+        finColumna = len(codigos2)
+    if salida is None:
+        salida = np.empty((finFila - inicioFila, finColumna - inicioColumna), dtype=np.uint8)
+
+    # Comparar cada fila del bloque contra todas las columnas en una sola operación
+    np.equal(codigos1[inicioFila:finFila, None], codigos2[None, inicioColumna:finColumna], out=salida, casting="unsafe")
+    return marcarDiagonalBloque(salida, inicioFila, finFila, inicioColumna, finColumna)
+
+# Función para marcar con 2 las coincidencias sobre la diagonal principal (i == j) que caen dentro del bloque
+def marcarDiagonalBloque(salida, inicioFila, finFila, inicioColumna, finColumna):
+    inicioDiagonal = max(inicioFila, inicioColumna)
+    finDiagonal = min(finFila, finColumna)
+    if inicioDiagonal < finDiagonal:
+        indices = np.arange(inicioDiagonal, finDiagonal)
+        salida[indices - inicioFila, indices - inicioColumna] *= np.uint8(2)  # 1 -> 2, 0 se mantiene
+    return salida
+
+# Función para calcular una tesela de coincidencias como matriz booleana, lista para empaquetarse en bits
+# La diagonal principal no se marca: DotplotEmpaquetado la deduce de los índices al desempaquetar
+def calcularCoincidencias(codigos1, codigos2, inicioFila, finFila, inicioColumna=0, finColumna=None):
+    if finColumna is None:
+        finColumna = len(codigos2)
+    return codigos1[inicioFila:finFila, None] == codigos2[None, inicioColumna:finColumna]
+
+# Función para calcular una tesela del dotplot por ventanas: la celda (i, j) vale 1 si la ventana diagonal de tamanoVentana
+# que empieza en (i, j) tiene al menos minimoCoincidencias coincidencias (filtra el ruido de las coincidencias sueltas)
+# Las sumas se obtienen con sumas acumuladas por diagonal calculadas de abajo hacia arriba, sin recalcular cada ventana;
+# la tesela necesita un halo de tamanoVentana - 1 filas y columnas, que fuera de las secuencias cuenta como sin coincidencia
+def calcularCoincidenciasVentana(codigos1, codigos2, inicioFila, finFila, inicioColumna, finColumna, tamanoVentana, minimoCoincidencias):
+    alto, ancho = finFila - inicioFila, finColumna - inicioColumna
+    altoHalo, anchoHalo = alto + tamanoVentana - 1, ancho + tamanoVentana - 1
+    filasDisponibles = min(inicioFila + altoHalo, len(codigos1)) - inicioFila
+    columnasDisponibles = min(inicioColumna + anchoHalo, len(codigos2)) - inicioColumna
+    coincidencias = np.zeros((altoHalo, anchoHalo), dtype=np.uint8)
+    np.equal(codigos1[inicioFila:inicioFila + filasDisponibles, None], codigos2[None, inicioColumna:inicioColumna + columnasDisponibles],
+             out=coincidencias[:filasDisponibles, :columnasDisponibles], casting="unsafe")
+
+    # acumulado[r, c] = coincidencias[r, c] + acumulado[r + 1, c + 1]: suma desde (r, c) hasta el final de su diagonal
+    # Se acumula con desborde (módulo 2^8 o 2^16): la diferencia de dos acumulados sigue siendo exacta mientras W < módulo
+    tipoAcumulado = np.uint8 if tamanoVentana < 2**8 else np.uint16 if tamanoVentana < 2**16 else np.uint32
+    acumulado = np.zeros((altoHalo + 1, anchoHalo + 1), dtype=tipoAcumulado)
+    for fila in range(altoHalo - 1, -1, -1):
+        np.add(coincidencias[fila], acumulado[fila + 1, 1:], out=acumulado[fila, :-1], casting="unsafe")
+
+    # La suma de la ventana que empieza en (i, j) es la diferencia de dos sumas acumuladas de la misma diagonal
+    sumas = acumulado[:alto, :ancho] - acumulado[tamanoVentana:tamanoVentana + alto, tamanoVentana:tamanoVentana + ancho]
+    return sumas >= minimoCoincidencias
+
+# Función para dividir un rango de filas en bloques consecutivos (inicio, fin)
+def dividirEnBloques(inicio, fin, tamanoBloque=filasPorBloque):
+    return [(i, min(i + tamanoBloque, fin)) for i in range(inicio, fin, tamanoBloque)]
+
+# Función para dividir las filas [inicioFila, finFila) del dotplot en teselas 2D (inicioFila, finFila, inicioColumna, finColumna)
+def dividirEnTeselas(inicioFila, finFila, numColumnas, columnasTesela=columnasPorTesela):
+    return [(inicio, fin, inicioColumna, finColumna)
+            for inicio, fin in dividirEnBloques(inicioFila, finFila)
+            for inicioColumna, finColumna in dividirEnBloques(0, numColumnas, columnasTesela)]
+
+# Función para calcular las filas [inicioFila, finFila) del dotplot escribiendo tesela a tesela en salida
+# Con empaquetado=True salida guarda 8 columnas por byte (ver formaSalida); inicioColumna de cada tesela es múltiplo de 8
+# Si se da vistaGeneral, cada tesela se acumula en ella apenas se calcula
+# Con ventanaDiagonal=(tamanoVentana, minimoCoincidencias) cada celda indica si su ventana diagonal supera el umbral
+def calcularBandaDotplot(codigos1, codigos2, inicioFila, finFila, salida, empaquetado=False, vistaGeneral=None, ventanaDiagonal=None):
+    with medirTramo("computo", filas=(inicioFila, finFila)):
+        for inicio, fin, inicioColumna, finColumna in dividirEnTeselas(inicioFila, finFila, len(codigos2)):
+            filas = slice(inicio - inicioFila, fin - inicioFila)
+            if ventanaDiagonal is not None:
+                tesela = calcularCoincidenciasVentana(codigos1, codigos2, inicio, fin, inicioColumna, finColumna, *ventanaDiagonal)
+                if empaquetado:
+                    empaquetarBloque(tesela, salida=salida[filas, inicioColumna // 8:columnasEmpaquetadas(finColumna)])
+                else:
+                    salida[filas, inicioColumna:finColumna] = tesela
+                    tesela = marcarDiagonalBloque(salida[filas, inicioColumna:finColumna], inicio, fin, inicioColumna, finColumna)
+            elif empaquetado:
+                tesela = calcularCoincidencias(codigos1, codigos2, inicio, fin, inicioColumna, finColumna)
+                empaquetarBloque(tesela, salida=salida[filas, inicioColumna // 8:columnasEmpaquetadas(finColumna)])
+            else:
+                tesela = calcularBloqueDotplot(codigos1, codigos2, inicio, fin, inicioColumna, finColumna,
+                                               salida=salida[filas, inicioColumna:finColumna])
+            if vistaGeneral is not None:
+                if tesela.dtype == bool:
+                    # La tesela empaquetada no lleva la diagonal: se marca en la tesela (ya guardada en bits) para que
+                    # la vista general sea la misma que con la matriz densa
+                    tesela = marcarDiagonalBloque(tesela.view(np.uint8), inicio, fin, inicioColumna, finColumna)
+                vistaGeneral.acumularBloque(tesela, inicio, inicioColumna)
+    return salida
+
+# Función para calcular la forma del arreglo que guarda un dotplot de forma (filas, columnas)
+def formaSalida(forma, empaquetado=False):
+    return (forma[0], columnasEmpaquetadas(forma[1])) if empaquetado else tuple(forma)
+
+# Función para crear la matriz del dotplot en memoria o, si se da rutaSalida, como archivo .npy mapeado en memoria
+def crearDotplotSalida(forma, rutaSalida=None, empaquetado=False):
+    forma = formaSalida(forma, empaquetado)
+    if rutaSalida is None:
+        return np.empty(forma, dtype=np.uint8)
+    return np.lib.format.open_memmap(rutaSalida, mode="w+", dtype=np.uint8, shape=forma)  # Se llena tesela a tesela en disco
+
+# Función para presentar el arreglo de salida como dotplot: denso tal cual o envuelto si está empaquetado
+def envolverDotplot(salida, numColumnas, empaquetado=False):
+    return DotplotEmpaquetado(salida, numColumnas) if empaquetado else salida
@@ -0,0 +1,113 @@
+import numpy as np  # Importar numpy para operaciones numéricas
+from Kernel import codificarSecuencia  # Codificación de las secuencias como uint8
+from Empaquetado import regionesIndices  # Mismas reglas de indexación que el dotplot empaquetado
+
+kmerMaximo = 32  # Un k-mer de hasta 32 bases cabe en un entero de 64 bits (2 bits por base)
+filasPorConsulta = 1 << 20  # Posiciones de la secuencia 1 que se consultan en cada bloque
+
+# Tabla que traduce cada byte a su base de 2 bits (A=0, C=1, G=2, T=3); cualquier otro carácter es inválido (255)
+tablaBases = np.full(256, 255, dtype=np.uint8)
+for valor, bases in enumerate(("Aa", "Cc", "Gg", "Tt")):
+    for base in bases:
+        tablaBases[ord(base)] = valor
+
+# Función para calcular el código entero de cada k-mer y si es válido (sin N ni otros caracteres)
+def codigosKmer(codigos, k):
+    numKmers = len(codigos) - k + 1
+    if numKmers <= 0:
+        return np.empty(0, dtype=np.uint64), np.empty(0, dtype=bool)
+    bases = tablaBases[codigos]
+
+    # Construir los códigos con k desplazamientos vectorizados en lugar de recorrer cada posición
+    kmers = np.zeros(numKmers, dtype=np.uint64)
+    for t in range(k):
+        kmers = (kmers << np.uint64(2)) | (bases[t:t + numKmers] & 3).astype(np.uint64)
+
+    # Un k-mer es válido si ninguna de sus k bases es inválida
+    invalidas = np.concatenate(([0], np.cumsum(bases == 255)))
+    validos = (invalidas[k:] - invalidas[:numKmers]) == 0
+    return kmers, validos
+
+# Función para construir el índice de k-mers de la secuencia 2: códigos ordenados y sus posiciones
+def construirIndiceKmer(secuencia2, k):
+    kmers, validos = codigosKmer(codificarSecuencia(secuencia2), k)
+    posiciones = np.nonzero(validos)[0]
+    kmers = kmers[posiciones]
+    orden = np.argsort(kmers, kind="stable")
+    return kmers[orden], posiciones[orden]
+
+# Función que recorre la secuencia 1 por bloques y devuelve, bloque a bloque, las coincidencias (i, j) contra el índice
+def buscarCoincidenciasKmer(secuencia1, indice, k, tamanoBloque=filasPorConsulta):
+    codigos1 = codificarSecuencia(secuencia1)
+    kmersIndice, posicionesIndice = indice
+    for inicio in range(0, max(len(codigos1) - k + 1, 0), tamanoBloque):
+        kmers, validos = codigosKmer(codigos1[inicio:inicio + tamanoBloque + k - 1], k)
+        filas = np.nonzero(validos)[0]
+        kmers = kmers[filas]
+
+        # Rango de posiciones de la secuencia 2 que comparten cada k-mer
+        # Las consultas se buscan ordenadas (mucho más rápido para searchsorted) y se devuelven a su orden original
+        orden = np.argsort(kmers)
+        izquierda = np.empty(len(kmers), dtype=np.int64)
+        derecha = np.empty(len(kmers), dtype=np.int64)
+        izquierda[orden] = np.searchsorted(kmersIndice, kmers[orden], side="left")
+        derecha[orden] = np.searchsorted(kmersIndice, kmers[orden], side="right")
+        cantidades = derecha - izquierda
+        total = int(cantidades.sum())
+
+        # Expandir cada rango [izquierda, derecha) sin bucles de Python
+        inicioRangos = np.cumsum(cantidades) - cantidades
+        indicesIndice = np.repeat(izquierda - inicioRangos, cantidades) + np.arange(total)
+        yield np.column_stack((np.repeat(filas + inicio, cantidades), posicionesIndice[indicesIndice]))
+
+# Función para calcular el dotplot disperso por k-mers: sólo se generan las celdas (i, j) donde empieza un k-mer común
+# Con vistaGeneral cada bloque de coincidencias se acumula en la vista general a medida que sale
+def kmerDotplot(secuencia1, secuencia2, k, vistaGeneral=None):
+    if not 1 <= k <= kmerMaximo:
+        raise ValueError(f"El tamaño de k-mer debe estar entre 1 y {kmerMaximo}")
+    indice = construirIndiceKmer(secuencia2, k)
+    bloques = []
+    for bloque in buscarCoincidenciasKmer(secuencia1, indice, k):
+        bloques.append(bloque)
+        if vistaGeneral is not None:
+            vistaGeneral.acumularCoincidencias(bloque)
+    coincidencias = np.concatenate(bloques) if bloques else np.empty((0, 2), dtype=np.int64)
+    return DotplotDisperso(coincidencias, (len(secuencia1), len(secuencia2)))
+
+# Clase que representa un dotplot disperso como lista de coincidencias (i, j) ordenadas por fila
+# Se indexa como la matriz densa: dotplot[:2000, :2000] rasteriza sólo esa región
+class DotplotDisperso:
+    def __init__(self, coincidencias, forma):
+        self.coincidencias = coincidencias
+        self.shape = tuple(forma)
+        self.dtype = np.dtype(np.uint8)
+        self.ndim = 2
+
+    def __len__(self):
+        return self.shape[0]
+
+    # Función para obtener las coincidencias dentro de [inicioFila, finFila) x [inicioColumna, finColumna)
+    def coincidenciasEnRegion(self, inicioFila, finFila, inicioColumna, finColumna):
+        filas = self.coincidencias[:, 0]
+        desde, hasta = np.searchsorted(filas, [inicioFila, finFila])  # Las filas están ordenadas
+        region = self.coincidencias[desde:hasta]
+        columnas = region[:, 1]
+        return region[(columnas >= inicioColumna) & (columnas < finColumna)]
+
+    def __getitem__(self, indices):
+        indices, (inicioFila, finFila, pasoFila), (inicioColumna, finColumna, pasoColumna) = regionesIndices(indices, self.shape)
+
+        # Rasterizar la región: 1 en cada coincidencia y 2 si además está en la diagonal principal
+        region = np.zeros((finFila - inicioFila, finColumna - inicioColumna), dtype=np.uint8)
+        celdas = self.coincidenciasEnRegion(inicioFila, finFila, inicioColumna, finColumna)
+        region[celdas[:, 0] - inicioFila, celdas[:, 1] - inicioColumna] = np.where(celdas[:, 0] == celdas[:, 1], 2, 1)
+        region = region[pasoFila, pasoColumna]
+        # Los índices enteros eliminan su eje, igual que en numpy
+        if isinstance(indices[1], (int, np.integer)):
+            region = region[:, 0]
+        if isinstance(indices[0], (int, np.integer)):
+            region = region[0]
+        return region
+
+    def __repr__(self):
+        return f"DotplotDisperso(forma={self.shape}, coincidencias={len(self.coincidencias)})"
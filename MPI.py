@@ -1,40 +1,108 @@
-from tqdm import tqdm  # Importar la barra de progreso
 import numpy as np  # Importar numpy para operaciones numéricas
 import time  # Importar time para medir tiempos de ejecución
 import matplotlib.pyplot as plt  # Importar pyplot para graficar
 from mpi4py import MPI  # Importar mpi4py para MPI
+from Kernel import codificarSecuencia, calcularBandaDotplot, crearDotplotSalida, envolverDotplot, formaSalida  # Kernel vectorizado del dotplot
+from Utilidades import mostrarFigura  # Mostrar figuras respetando el modo headless
+from Perfilado import medirTramo  # Tramos de la traza (cada rank registra los suyos)
+
+bytesPorEscritura = 64 * 2**20  # Tamaño aproximado de cada bloque que un proceso escribe con MPI-IO
+
+# Función para calcular el rango de filas [inicio, fin) que le corresponde a un proceso
+def bandaDeFilas(numFilas, rank, size):
+    return rank * numFilas // size, (rank + 1) * numFilas // size
+
+# Función para difundir desde el proceso 0 las secuencias codificadas a todos los procesos
+def difundirSecuencias(secuencia1, secuencia2, comm):
+    rank = comm.Get_rank()
+    if rank == 0:
+        codigos1 = codificarSecuencia(secuencia1)
+        codigos2 = codificarSecuencia(secuencia2)
+        longitudes = (len(codigos1), len(codigos2))
+    longitudes = comm.bcast(longitudes if rank == 0 else None, root=0)  # Sólo las longitudes viajan serializadas
+    if rank != 0:
+        codigos1 = np.empty(longitudes[0], dtype=np.uint8)
+        codigos2 = np.empty(longitudes[1], dtype=np.uint8)
+    with medirTramo("difusion", bytes=longitudes[0] + longitudes[1]):
+        comm.Bcast([codigos1, MPI.UNSIGNED_CHAR], root=0)  # Difusión por buffer, sin pickle
+        comm.Bcast([codigos2, MPI.UNSIGNED_CHAR], root=0)
+    return codigos1, codigos2
+
+# Función para combinar en el proceso 0 las vistas generales de todos los procesos (máximo celda a celda)
+def reducirVistaGeneral(vistaGeneral, comm):
+    if vistaGeneral is None:
+        return
+    with medirTramo("reduccionVista"):
+        if comm.Get_rank() == 0:
+            comm.Reduce(MPI.IN_PLACE, vistaGeneral.imagen, op=MPI.MAX, root=0)
+        else:
+            comm.Reduce(vistaGeneral.imagen, None, op=MPI.MAX, root=0)
 
 # Función para paralelizar el cálculo de dotplot utilizando MPI
-def paralelizarMpiDotplot(secuencia1, secuencia2):
-    comm = MPI.COMM_WORLD  # Obtener el comunicador MPI
+# Todos los procesos del comunicador deben llamarla; sólo el proceso 0 necesita las secuencias.
+# Sin rutaSalida el resultado se junta en el proceso 0 con Gatherv; con rutaSalida cada proceso
+# escribe su banda en un archivo .npy compartido con MPI-IO colectivo y el proceso 0 lo abre como memmap.
+# Con empaquetado=True las bandas viajan y se guardan en bits (8 veces menos datos) y se devuelve un DotplotEmpaquetado.
+# Con vistaGeneral (creada en todos los procesos) cada uno acumula su banda y se combinan en el proceso 0 con Reduce(MAX).
+# Con ventanaDiagonal=(tamanoVentana, minimoCoincidencias) sólo se marcan las celdas cuya ventana diagonal supera el umbral;
+# cada proceso lee el halo de las filas siguientes de las secuencias completas que ya recibió.
+def paralelizarMpiDotplot(secuencia1, secuencia2, comm=MPI.COMM_WORLD, rutaSalida=None, empaquetado=False, vistaGeneral=None,
+                          ventanaDiagonal=None):
     rank = comm.Get_rank()  # Obtener el rango (rank) del proceso actual
     size = comm.Get_size()  # Obtener el tamaño (número de procesos) del comunicador
 
-    # Dividir el índice de secuencia1 en partes iguales entre los procesos
-    chunks = np.array_split(range(len(secuencia1)), size)
+    # El proceso 0 codifica las secuencias y las difunde una sola vez
+    codigos1, codigos2 = difundirSecuencias(secuencia1, secuencia2, comm)
+    numFilas, numColumnas = len(codigos1), len(codigos2)
+    columnasSalida = formaSalida((numFilas, numColumnas), empaquetado)[1]  # Bytes por fila en la salida
+
+    # Banda de filas de este proceso, en índices globales
+    inicioFila, finFila = bandaDeFilas(numFilas, rank, size)
 
-    # Crear una matriz vacía para almacenar el dotplot local de cada proceso
-    dotplot = np.empty([len(chunks[rank]), len(secuencia2)], dtype=np.uint8)
+    if rutaSalida is None:
+        # Calcular la banda local completa y juntarla en el proceso 0 con Gatherv (buffers, sin pickle)
+        dotplotLocal = calcularBandaDotplot(codigos1, codigos2, inicioFila, finFila,
+                                            crearDotplotSalida((finFila - inicioFila, numColumnas), empaquetado=empaquetado),
+                                            empaquetado, vistaGeneral, ventanaDiagonal)
+        reducirVistaGeneral(vistaGeneral, comm)
+        # Los conteos y desplazamientos se cuentan en filas completas (un tipo derivado de columnasSalida bytes):
+        # en bytes son int de C y desbordan cuando la matriz pasa de 2 GiB
+        tipoFila = MPI.UNSIGNED_CHAR.Create_contiguous(columnasSalida).Commit()
+        conteos = [bandaDeFilas(numFilas, r, size)[1] - bandaDeFilas(numFilas, r, size)[0] for r in range(size)]
+        desplazamientos = [bandaDeFilas(numFilas, r, size)[0] for r in range(size)]
+        dotplot = crearDotplotSalida((numFilas, numColumnas), empaquetado=empaquetado) if rank == 0 else None
+        with medirTramo("gather", bytes=dotplotLocal.nbytes):
+            comm.Gatherv([dotplotLocal, finFila - inicioFila, tipoFila],
+                         [dotplot, conteos, desplazamientos, tipoFila] if rank == 0 else None, root=0)
+        tipoFila.Free()
+        return envolverDotplot(dotplot, numColumnas, empaquetado) if rank == 0 else None
 
-    # Iterar sobre los índices asignados al proceso actual
-    for i in tqdm(range(len(chunks[rank]))):  # Usar tqdm para mostrar una barra de progreso
-        for j in range(len(secuencia2)):
-            # Comparar caracteres de secuencia1 y secuencia2 para calcular el dotplot
-            if secuencia1[chunks[rank][i]] == secuencia2[j]:
-                if i == j:
-                    dotplot[i, j] = np.uint8(2)  # Si coinciden en la diagonal principal
-                else:
-                    dotplot[i, j] = np.uint8(1)  # Si coinciden fuera de la diagonal principal
-            else:
-                dotplot[i, j] = np.uint8(0)  # Si no coinciden
+    # El proceso 0 crea el archivo .npy con su cabecera y comparte el desplazamiento donde empiezan los datos
+    if rank == 0:
+        archivo = crearDotplotSalida((numFilas, numColumnas), rutaSalida, empaquetado)
+        desplazamientoDatos = archivo.offset
+        del archivo
+    desplazamientoDatos = comm.bcast(desplazamientoDatos if rank == 0 else None, root=0)
 
-    # Recopilar todos los dotplots locales en el proceso 0
-    dotplot = comm.gather(dotplot, root=0)
+    # Cada proceso escribe su banda por bloques; todos hacen el mismo número de escrituras colectivas
+    filasPorEscritura = max(1, bytesPorEscritura // max(columnasSalida, 1))
+    filasMaximas = max(bandaDeFilas(numFilas, r, size)[1] - bandaDeFilas(numFilas, r, size)[0] for r in range(size))
+    numEscrituras = -(-filasMaximas // filasPorEscritura)
+    archivoMPI = MPI.File.Open(comm, rutaSalida, MPI.MODE_WRONLY)
+    for k in range(numEscrituras):
+        inicio = min(inicioFila + k * filasPorEscritura, finFila)
+        fin = min(inicio + filasPorEscritura, finFila)
+        bloque = calcularBandaDotplot(codigos1, codigos2, inicio, fin,
+                                      crearDotplotSalida((fin - inicio, numColumnas), empaquetado=empaquetado), empaquetado,
+                                      vistaGeneral, ventanaDiagonal)
+        with medirTramo("escrituraMPI", bytes=bloque.nbytes):
+            archivoMPI.Write_at_all(desplazamientoDatos + inicio * columnasSalida, bloque)
+    archivoMPI.Close()
+    reducirVistaGeneral(vistaGeneral, comm)
 
-    # Proceso 0: combinar los dotplots y devolver el resultado final
+    # El proceso 0 devuelve el dotplot como memmap de sólo lectura
     if rank == 0:
-        merged_data = np.vstack(dotplot)  # Combinar los dotplots recopilados
-        return merged_data
+        return envolverDotplot(np.load(rutaSalida, mmap_mode="r"), numColumnas, empaquetado)
 
 # Función para graficar análisis de tiempos, aceleraciones y eficiencias usando MPI
 def graficarAnalisisMPI(tiempos, aceleraciones, eficiencias, numProcesadores):
@@ -58,4 +126,4 @@ def graficarAnalisisMPI(tiempos, aceleraciones, eficiencias, numProcesadores):
     plt.savefig("Imagenes/MPI/graficasMPI.png")
 
     # Mostrar la figura en pantalla
-    plt.show()
+    mostrarFigura()
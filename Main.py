@@ -1,3 +1,5 @@
+import os
+import sys
 import time
 from mpi4py import MPI
 import argparse
@@ -5,10 +7,29 @@ import numpy as np
 from MPI import *  # Importa funciones específicas para MPI
 from Multiprocessing import *  # Importa funciones específicas para multiprocessing
 from Secuencial import *  # Importa funciones específicas para ejecución secuencial
+from Hilos import *  # Importa funciones específicas para el pool de hilos
+from Kmer import *  # Importa funciones específicas para el dotplot disperso por k-mers
 from Utilidades import *  # Importa utilidades adicionales
+from VistaGeneral import *  # Importa la vista general acumulada durante el cálculo
+from Filtro import *  # Importa el filtro de diagonales paralelo por teselas
+from Benchmark import ejecutarBenchmark  # Subcomando benchmark
+from Servicio import ejecutarServicio  # Subcomando serve
+from Regiones import *  # Importa el cálculo por regiones con almacén de teselas
+import Perfilado  # Traza por tramos, perfil con cProfile y barras de progreso
+from Perfilado import activarTraza, reunirEventosMPI, resumirTraza, guardarTraza, ejecutarConPerfil
 
 def main():
     
+    # Subcomando benchmark: barrido reproducible de backends con sus propios argumentos
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        ejecutarBenchmark(sys.argv[2:])
+        return
+
+    # Subcomando serve: servicio de larga duración que atiende trabajos de dotplot con caché
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        ejecutarServicio(sys.argv[2:])
+        return
+
     tiempoInicioNoParalelo = time.time()  # Marca el inicio del tiempo de ejecución del bloque no paralelo
     
     # Inicialización de MPI
@@ -22,65 +43,128 @@ def main():
     # Agrega argumentos al parser para especificar archivos, modos de ejecución y otros parámetros
     parser.add_argument('--file1', dest='archivo1', type=str, default=None, help='Archivo 1 de secuencia en formato FASTA')
     parser.add_argument('--file2', dest='archivo2', type=str, default=None, help='Archivo 2 de secuencia en formato FASTA')
-    parser.add_argument('--maxLen', dest='maxLen', type=int, default=10000, help='Max tamaño de las secuencias a comparar')
+    parser.add_argument('--maxLen', dest='maxLen', type=int, default=10000, help='Max tamaño de las secuencias a comparar (0 para usar las secuencias completas)')
     parser.add_argument('--sequential', action='store_true', help='Ejecutar en modo secuencial')
     parser.add_argument('--multiprocessing', action='store_true', help='Ejecutar utilizando multiprocessing')
+    parser.add_argument('--threads', action='store_true', help='Ejecutar utilizando un pool de hilos sobre una única matriz')
     parser.add_argument('--mpi', action='store_true', help='Ejecutar utilizando mpi4py')
+    parser.add_argument('--kmer', dest='kmer', type=int, default=None, help='Ejecutar el dotplot disperso por k-mers de tamaño K')
+    parser.add_argument('--output', dest='rutaSalida', type=str, default=None, help='Archivo .npy donde escribir el dotplot tesela a tesela en lugar de la RAM (MPI-IO colectivo en modo MPI)')
+    parser.add_argument('--packed', action='store_true', help='Guardar el dotplot empaquetado en bits (8 veces menos memoria)')
+    parser.add_argument('--headless', action='store_true', help='Sin ventanas ni matrices por consola; las imágenes muestran la vista general de todo el dotplot')
+    parser.add_argument('--shared_memory', action='store_true', help='Usar memoria compartida y un único pool en multiprocessing')
+    parser.add_argument('--filter_processes', dest='procesosFiltro', type=int, default=None, help='Filtrar el dotplot completo por teselas con N procesos en lugar del recorte de 2000x2000')
+    parser.add_argument('--window', dest='tamanoVentana', type=int, default=None, help='Modo por ventanas: tamaño W de la ventana diagonal (el resultado se guarda empaquetado en bits)')
+    parser.add_argument('--min_matches', dest='minimoCoincidencias', type=int, default=None, help='Coincidencias mínimas S en la ventana para marcar la celda (por defecto W)')
+    parser.add_argument('--region1', dest='region1', type=leerRegion, default=None, help='Región inicio:fin de la secuencia 1 (calcula sólo esa ventana de las secuencias completas)')
+    parser.add_argument('--region2', dest='region2', type=leerRegion, default=None, help='Región inicio:fin de la secuencia 2')
+    parser.add_argument('--tile_store', dest='carpetaAlmacen', type=str, default=carpetaAlmacenTeselas, help='Carpeta del almacén persistente de teselas de --region1/--region2')
+    parser.add_argument('--trace', dest='rutaTraza', type=str, default=None, help='Registrar tramos (carga, codificación, cómputo, comunicación, filtro, render) por proceso y guardarlos como traza JSON de Chrome')
+    parser.add_argument('--profile', dest='rutaPerfil', type=str, default=None, help='Ejecutar bajo cProfile y guardar las estadísticas en este archivo')
+    parser.add_argument('--no_progress', action='store_true', help='Sin barras de progreso (no suman su costo a los tiempos medidos)')
     parser.add_argument('--num_processes', dest='num_procesadores', type=int, nargs='+', default=[1, 2, 4, 8, 16], help='Número de procesos para la opción MPI')
     args = parser.parse_args()
 
-    # Solo el proceso con rank 0 realiza la carga y preparación de datos
-    
+    # Modo por ventanas: sólo se marcan las celdas cuya ventana diagonal de W bases tiene al menos S coincidencias
+    ventanaDiagonal = None
+    if args.tamanoVentana is not None:
+        minimoCoincidencias = args.minimoCoincidencias if args.minimoCoincidencias is not None else args.tamanoVentana
+        if not 1 <= minimoCoincidencias <= args.tamanoVentana:
+            parser.error("--window debe ser al menos 1 y --min_matches debe estar entre 1 y --window")
+        ventanaDiagonal = (args.tamanoVentana, minimoCoincidencias)
+        args.packed = True  # El resultado es casi todo ceros: se guarda en bits
+
+    # Modo k-mer: el código de cada k-mer debe caber en un entero de 64 bits
+    if args.kmer is not None and not 1 <= args.kmer <= kmerMaximo:
+        parser.error(f"--kmer debe estar entre 1 y {kmerMaximo}")
+
+    if args.headless:
+        activarModoHeadless()  # Backend Agg: las figuras sólo se guardan
+
+    if args.no_progress:
+        Perfilado.mostrarProgreso = False  # Sin barras de progreso en ningún backend
+    if args.rutaTraza:
+        activarTraza(f"rank {rank}")  # Cada rank registra sus tramos; los workers de los pools devuelven los suyos
+
     cargaArchivoInicio = time.time()  # Marca el inicio del tiempo de carga de archivos
     archivoPath1 = args.archivo1  # Ruta del archivo 1
     archivoPath2 = args.archivo2  # Ruta del archivo 2
 
     numProcesadoresArray = args.num_procesadores  # Lista de números de procesadores para pruebas
 
-    try:
-        # Leer los archivos FASTA
-        secuenciaTotal1 = leerArchivoFasta(archivoPath1)
-        secuenciaTotal2 = leerArchivoFasta(archivoPath2)
-    except FileNotFoundError as e:
-        print("Archivo no encontrado, verifique la ruta")
-        exit(1)
-
-    # Reducir tamaño de las secuencias para manejar el problema de memoria
-    maxLen = args.maxLen  # Máximo tamaño permitido para las secuencias
-    Secuencia1 = secuenciaTotal1[:maxLen]  # Recorta la secuencia 1
-    Secuencia2 = secuenciaTotal2[:maxLen]  # Recorta la secuencia 2
-    cargaArchivoFinal = time.time()  # Marca el final del tiempo de carga de archivos
-
-    # Guardar el tiempo de carga de los archivos
-    guardarResultadosArchivo([f"Tiempo de carga de los archivos: {cargaArchivoFinal - cargaArchivoInicio}"], 
-                                nombreArchivo="ReporteTxt/tiempoDeCargaArchivos.txt")
-
-    # Inicializar el dotplot y las listas para guardar resultados
-    dotplot = np.empty([len(Secuencia1), len(Secuencia2)], dtype=np.uint8)  # Matriz vacía para el dotplot
+    # Sólo el proceso con rank 0 lee los archivos; en modo MPI las secuencias se difunden después
+    Secuencia1 = Secuencia2 = None
+    if rank == 0:
+        try:
+            # Leer los archivos FASTA
+            secuenciaTotal1 = leerArchivoFasta(archivoPath1)
+            secuenciaTotal2 = leerArchivoFasta(archivoPath2)
+        except FileNotFoundError as e:
+            print("Archivo no encontrado, verifique la ruta")
+            comm.Abort(1)
+
+        # Las regiones ya tienen la forma inicio:fin; aquí se comprueba que empiecen dentro de las secuencias completas
+        for opcion, region, secuenciaTotal in (("--region1", args.region1, secuenciaTotal1), ("--region2", args.region2, secuenciaTotal2)):
+            if region is not None and region[0] >= len(secuenciaTotal):
+                parser.error(f"{opcion} empieza en {region[0]} pero la secuencia sólo tiene {len(secuenciaTotal)} bases")
+
+        # Reducir tamaño de las secuencias para manejar el problema de memoria
+        maxLen = args.maxLen or None  # Máximo tamaño permitido para las secuencias (0: sin recorte, p. ej. con --output)
+        Secuencia1 = secuenciaTotal1[:maxLen]  # Recorta la secuencia 1
+        Secuencia2 = secuenciaTotal2[:maxLen]  # Recorta la secuencia 2
+        cargaArchivoFinal = time.time()  # Marca el final del tiempo de carga de archivos
+
+        # Guardar el tiempo de carga de los archivos
+        guardarResultadosArchivo([f"Tiempo de carga de los archivos: {cargaArchivoFinal - cargaArchivoInicio}"], 
+                                    nombreArchivo="ReporteTxt/tiempoDeCargaArchivos.txt")
+
+    # Forma del dotplot conocida por todos los procesos (la vista general de MPI se crea en cada uno)
+    formaDotplot = comm.bcast((len(Secuencia1), len(Secuencia2)) if rank == 0 else None, root=0)
+
+    # Inicializar las listas para guardar resultados
     resultadosPrint = []  # Lista para almacenar resultados de multiprocessing
     resultadosPrintMPI = []  # Lista para almacenar resultados de MPI
     tiemposMultiprocessing = []  # Lista para almacenar tiempos de multiprocessing
     tiemposMPI = []  # Lista para almacenar tiempos de MPI
+    resultadosPrintHilos = []  # Lista para almacenar resultados de hilos
+    tiemposHilos = []  # Lista para almacenar tiempos de hilos
 
     
     tiempoFinalNoParalelo = time.time() - tiempoInicioNoParalelo  # Calcula el tiempo total de ejecución del bloque no paralelo
     
     # Ejecutar en modo multiprocessing si se especifica en los argumentos
-    if args.multiprocessing:
+    if args.multiprocessing and rank == 0:
+        if args.shared_memory:
+            # Secuencias y matriz de salida en memoria compartida; el pool se crea una sola vez para todo el barrido
+            dotplotCompartido = DotplotCompartido(Secuencia1, Secuencia2, rutaSalida=args.rutaSalida,
+                                                  empaquetado=args.packed, ventanaDiagonal=ventanaDiagonal)
+            poolMultiprocessing = crearPoolMultiprocessing(max(numProcesadoresArray))
+
         for cantidadProcesadores in numProcesadoresArray:
+            vistaMultiprocessing = VistaGeneral(formaDotplot) if args.headless else None  # Vista general de todo el dotplot
             tiempoInicioPacial = time.time()  # Marca el inicio del tiempo de procesamiento
             # Ejecuta el dotplot en paralelo usando multiprocessing
-            dotplotMultiprocessing = np.array(paralelizarMultiprocessingDotplot(Secuencia1, Secuencia2, 
-                                                                                numProcesadores=cantidadProcesadores), dtype=np.uint8)
+            if args.shared_memory:
+                dotplotMultiprocessing = paralelizarMultiprocessingCompartido(dotplotCompartido, poolMultiprocessing,
+                                                                              numProcesadores=cantidadProcesadores,
+                                                                              vistaGeneral=vistaMultiprocessing)
+            else:
+                dotplotMultiprocessing = paralelizarMultiprocessingDotplot(Secuencia1, Secuencia2, 
+                                                                           numProcesadores=cantidadProcesadores,
+                                                                           rutaSalida=args.rutaSalida,
+                                                                           empaquetado=args.packed,
+                                                                           vistaGeneral=vistaMultiprocessing,
+                                                                           ventanaDiagonal=ventanaDiagonal)
             tiempoTotalPacial = time.time() - tiempoInicioPacial  # Calcula el tiempo total de ejecución
             tiemposMultiprocessing.append(tiempoTotalPacial)
             resultadosPrint.append(f"Tiempo de ejecución parcial con {cantidadProcesadores} procesadores: {tiempoTotalPacial}")
 
             # Graficar y filtrar el dotplot
-            graficarDotplot(dotplotMultiprocessing[:2000, :2000], figNombre=f"Imagenes/Multiprocessing/dotplot_{cantidadProcesadores}_procesadores.png")
+            graficarDotplot(vistaMultiprocessing if args.headless else dotplotMultiprocessing[:2000, :2000],
+                            figNombre=f"Imagenes/Multiprocessing/dotplot_{cantidadProcesadores}_procesadores.png")
             
             pathImagen = f'Imagenes/Filtradas/dotplotFiltrado_{cantidadProcesadores}_procesadores.png'
-            aplicarFiltroConvolucion(dotplotMultiprocessing[:2000, :2000], pathImagen)
+            filtrarDotplot(dotplotMultiprocessing, pathImagen, recorte=2000, numProcesadores=args.procesosFiltro)
         
         # Calcular aceleración y eficiencia
         aceleraciones = aceleracion(tiemposMultiprocessing)
@@ -93,9 +177,10 @@ def main():
         
         # Guardar resultados y graficar análisis
         graficarAnalisisMultiprocessing(tiemposMultiprocessing, aceleraciones, eficiencias, numProcesadoresArray)
-        graficarDotplot(dotplotMultiprocessing[:2000, :2000], figNombre='Imagenes/Multiprocessing/dotplotMultiprocessing.png')
+        graficarDotplot(vistaMultiprocessing if args.headless else dotplotMultiprocessing[:2000, :2000],
+                        figNombre='Imagenes/Multiprocessing/dotplotMultiprocessing.png')
         pathImagen = 'Imagenes/Filtradas/dotplotFiltradoMultiprocessing.png'  
-        aplicarFiltroConvolucion(dotplotMultiprocessing[:2000, :2000], pathImagen)
+        filtrarDotplot(dotplotMultiprocessing, pathImagen, recorte=2000, numProcesadores=args.procesosFiltro)
         
         # Calcular tiempo de ejecución en bloque
         for i in range(len(numProcesadoresArray)):
@@ -103,60 +188,190 @@ def main():
         
         guardarResultadosArchivo(resultadosPrint, nombreArchivo="ReporteTxt/resultadosMultiprocessing.txt")
 
+        if args.shared_memory:
+            # Cerrar el pool y liberar la memoria compartida al terminar el barrido
+            poolMultiprocessing.close()
+            poolMultiprocessing.join()
+            del dotplotMultiprocessing
+            dotplotCompartido.liberar()
+
+    # Ejecutar en modo hilos si se especifica en los argumentos
+    if args.threads and rank == 0:
+        for cantidadHilos in numProcesadoresArray:
+            vistaHilos = VistaGeneral(formaDotplot) if args.headless else None  # Vista general de todo el dotplot
+            tiempoInicioPacial = time.time()  # Marca el inicio del tiempo de procesamiento
+            # Ejecuta el dotplot en paralelo con un pool de hilos que escriben en la misma matriz
+            dotplotHilos = paralelizarHilosDotplot(Secuencia1, Secuencia2, numHilos=cantidadHilos,
+                                                   rutaSalida=args.rutaSalida, empaquetado=args.packed,
+                                                   vistaGeneral=vistaHilos, ventanaDiagonal=ventanaDiagonal)
+            tiempoTotalPacial = time.time() - tiempoInicioPacial  # Calcula el tiempo total de ejecución
+            tiemposHilos.append(tiempoTotalPacial)
+            resultadosPrintHilos.append(f"Tiempo de ejecución parcial con {cantidadHilos} hilos: {tiempoTotalPacial}")
+
+            # Graficar y filtrar el dotplot
+            graficarDotplot(vistaHilos if args.headless else dotplotHilos[:2000, :2000],
+                            figNombre=f"Imagenes/Hilos/dotplot_{cantidadHilos}_hilos.png")
+
+            pathImagen = f'Imagenes/Filtradas/dotplotFiltradoHilos_{cantidadHilos}_hilos.png'
+            filtrarDotplot(dotplotHilos, pathImagen, recorte=2000, numProcesadores=args.procesosFiltro)
+
+        # Calcular aceleración y eficiencia
+        aceleraciones = aceleracion(tiemposHilos)
+        for i in range(len(aceleraciones)):
+            resultadosPrintHilos.append(f"Aceleración con {numProcesadoresArray[i]} hilos: {aceleraciones[i]}")
+
+        eficiencias = eficiencia(aceleraciones, numProcesadoresArray)
+        for i in range(len(eficiencias)):
+            resultadosPrintHilos.append(f"Eficiencia con {numProcesadoresArray[i]} hilos: {eficiencias[i]}")
+
+        # Guardar resultados y graficar análisis
+        graficarAnalisisHilos(tiemposHilos, aceleraciones, eficiencias, numProcesadoresArray)
+
+        # Calcular tiempo de ejecución en bloque
+        for i in range(len(numProcesadoresArray)):
+            resultadosPrintHilos.append(f"Tiempo de ejecución en bloque con {numProcesadoresArray[i]} hilos: {tiemposHilos[i]+tiempoFinalNoParalelo}")
+
+        guardarResultadosArchivo(resultadosPrintHilos, nombreArchivo="ReporteTxt/resultadosHilos.txt")
+
     # Ejecutar en modo MPI si se especifica en los argumentos
     if args.mpi:
-        if rank == 0:
-            for cantidadProcesadores in numProcesadoresArray:
-                tiempoInicioPacial = time.time()  # Marca el inicio del tiempo de procesamiento
-                dotplot = paralelizarMpiDotplot(Secuencia1, Secuencia2)  # Ejecuta el dotplot en paralelo usando MPI
-                tiempoTotalPacial = time.time() - tiempoInicioPacial  # Calcula el tiempo total de ejecución
+        procesadoresMPI = []  # Cantidades de procesos que realmente se ejecutaron
+        for cantidadProcesadores in numProcesadoresArray:
+            if cantidadProcesadores > size:
+                if rank == 0:
+                    print(f"Se omite la prueba con {cantidadProcesadores} procesadores: mpiexec se lanzó con {size}")
+                continue
+
+            # Subcomunicador con los primeros cantidadProcesadores procesos; el resto espera en la barrera
+            subcomm = comm.Split(0 if rank < cantidadProcesadores else MPI.UNDEFINED, rank)
+            vistaMPI = VistaGeneral(formaDotplot) if args.headless else None  # Vista general de todo el dotplot
+            comm.Barrier()
+            tiempoInicioPacial = time.time()  # Marca el inicio del tiempo de procesamiento
+            if subcomm != MPI.COMM_NULL:
+                # Todos los procesos del subcomunicador calculan su banda del dotplot
+                dotplot = paralelizarMpiDotplot(Secuencia1, Secuencia2, comm=subcomm, rutaSalida=args.rutaSalida,
+                                                empaquetado=args.packed, vistaGeneral=vistaMPI, ventanaDiagonal=ventanaDiagonal)
+                subcomm.Free()
+            tiempoTotalPacial = time.time() - tiempoInicioPacial  # Calcula el tiempo total de ejecución
+            comm.Barrier()
+
+            if rank == 0:
+                procesadoresMPI.append(cantidadProcesadores)
                 tiemposMPI.append(tiempoTotalPacial)
                 resultadosPrintMPI.append(f"Tiempo de ejecución con {cantidadProcesadores} procesadores: {tiempoTotalPacial}")
 
                 # Graficar y filtrar el dotplot
-                graficarDotplot(dotplot[:2000, :2000], figNombre=f"Imagenes/MPI/dotplot_{cantidadProcesadores}_procesadores.png")
+                graficarDotplot(vistaMPI if args.headless else dotplot[:2000, :2000],
+                                figNombre=f"Imagenes/MPI/dotplot_{cantidadProcesadores}_procesadores.png")
                 
                 pathImagen = f'Imagenes/Filtradas/dotplotFiltradoMPI_{cantidadProcesadores}_procesadores.png'
-                aplicarFiltroConvolucion(dotplot[:2000, :2000], pathImagen)
-          
+                filtrarDotplot(dotplot, pathImagen, recorte=2000, numProcesadores=args.procesosFiltro)
+
+        if rank == 0 and procesadoresMPI:
             # Calcular aceleración y eficiencia
             aceleraciones = aceleracion(tiemposMPI)
             for i in range(len(aceleraciones)):
-                resultadosPrintMPI.append(f"Aceleración con {numProcesadoresArray[i]} procesadores: {aceleraciones[i]}")
+                resultadosPrintMPI.append(f"Aceleración con {procesadoresMPI[i]} procesadores: {aceleraciones[i]}")
             
-            eficiencias = eficiencia(aceleraciones, numProcesadoresArray)
+            eficiencias = eficiencia(aceleraciones, procesadoresMPI)
             for i in range(len(eficiencias)):
-                resultadosPrintMPI.append(f"Eficiencia con {numProcesadoresArray[i]} procesadores: {eficiencias[i]}")
+                resultadosPrintMPI.append(f"Eficiencia con {procesadoresMPI[i]} procesadores: {eficiencias[i]}")
 
             # Guardar resultados y graficar análisis
-            graficarAnalisisMPI(tiemposMPI, aceleraciones, eficiencias, numProcesadoresArray)
-            graficarDotplot(dotplot[:2000, :2000], figNombre='Imagenes/MPI/dotplotMPI.png')
+            graficarAnalisisMPI(tiemposMPI, aceleraciones, eficiencias, procesadoresMPI)
+            graficarDotplot(vistaMPI if args.headless else dotplot[:2000, :2000],
+                            figNombre='Imagenes/MPI/dotplotMPI.png')
             pathImagen = 'Imagenes/Filtradas/dotplotFiltradoMPI.png'  
-            aplicarFiltroConvolucion(dotplot[:2000, :2000], pathImagen)
+            filtrarDotplot(dotplot, pathImagen, recorte=2000, numProcesadores=args.procesosFiltro)
             
             # Calcular tiempo de ejecución en bloque
-            for i in range(len(numProcesadoresArray)):
-                resultadosPrintMPI.append(f"Tiempo de ejecución en bloque con {numProcesadoresArray[i]} procesadores: {tiemposMPI[i]+tiempoFinalNoParalelo}")
+            for i in range(len(procesadoresMPI)):
+                resultadosPrintMPI.append(f"Tiempo de ejecución en bloque con {procesadoresMPI[i]} procesadores: {tiemposMPI[i]+tiempoFinalNoParalelo}")
             
             guardarResultadosArchivo(resultadosPrintMPI, nombreArchivo="ReporteTxt/ResultadosMPI.txt")
 
     # Ejecutar en modo secuencial si se especifica en los argumentos
-    if args.sequential:
+    if args.sequential and rank == 0:
+        vistaSecuencial = VistaGeneral(formaDotplot) if args.headless else None  # Vista general de todo el dotplot
         inicioSecuencial = time.time()  # Marca el inicio del tiempo de procesamiento secuencial
-        dotplotSequential = sequentialDotplot(Secuencia1, Secuencia2)  # Ejecuta el dotplot de forma secuencial
+        dotplotSequential = sequentialDotplot(Secuencia1, Secuencia2, rutaSalida=args.rutaSalida, empaquetado=args.packed,
+                                              vistaGeneral=vistaSecuencial, ventanaDiagonal=ventanaDiagonal)  # Ejecuta el dotplot de forma secuencial
         tiempoTotalPacial = time.time() - inicioSecuencial  # Calcula el tiempo total de ejecución
         resultadosPrint.append(f"Tiempo de ejecución secuencial: {tiempoTotalPacial}")
 
         # Graficar y filtrar el dotplot
-        graficarDotplot(dotplotSequential[:5000, :5000], figNombre="Imagenes/Secuencial/dotplotSecuencial.png")
+        graficarDotplot(vistaSecuencial if args.headless else dotplotSequential[:5000, :5000], figNombre="Imagenes/Secuencial/dotplotSecuencial.png")
         
         pathImagen = 'Imagenes/Filtradas/dotplotFiltradaSequential.png'
-        aplicarFiltroConvolucion(dotplotSequential[:5000, :5000], pathImagen)
+        filtrarDotplot(dotplotSequential, pathImagen, recorte=5000, numProcesadores=args.procesosFiltro)
         
         # Calcular tiempo de ejecución en bloque
         resultadosPrint.append(f"Tiempo de ejecución en bloque secuencial: {tiempoTotalPacial+tiempoFinalNoParalelo}")
         
         guardarResultadosArchivo(resultadosPrint, nombreArchivo="ReporteTxt/resultadoSequential.txt")
 
+    # Ejecutar sólo la ventana pedida de las secuencias completas si se especifica alguna región
+    if (args.region1 or args.region2) and rank == 0:
+        region1 = args.region1 or (0, None)  # Sin región se usa la secuencia completa
+        region2 = args.region2 or (0, None)
+        inicioRegion = time.time()  # Marca el inicio del tiempo de procesamiento de la región
+        dotplotRegion, resumenRegion = calcularRegion(secuenciaTotal1, secuenciaTotal2, region1, region2,
+                                                      almacen=AlmacenTeselas(args.carpetaAlmacen),
+                                                      numProcesadores=max(numProcesadoresArray), rutaSalida=args.rutaSalida)
+        tiempoTotalPacial = time.time() - inicioRegion  # Calcula el tiempo total de ejecución
+        ventana = resumenRegion["ventana"]
+        resultadosPrintRegion = [f"Ventana calculada: [{ventana[0]}:{ventana[1]}] x [{ventana[2]}:{ventana[3]}]",
+                                 f"Tiempo de ejecución de la región: {tiempoTotalPacial}",
+                                 f"Teselas reutilizadas del almacén: {resumenRegion['teselasReutilizadas']} de {resumenRegion['teselas']}"]
+
+        # Graficar y filtrar la ventana con los ejes en coordenadas de las secuencias completas
+        graficarDotplot(generarVistaGeneral(dotplotRegion) if args.headless else dotplotRegion[:2000, :2000],
+                        figNombre="Imagenes/Regiones/dotplotRegion.png", origen=(ventana[0], ventana[2]))
+
+        pathImagen = 'Imagenes/Filtradas/dotplotFiltradoRegion.png'
+        filtrarDotplot(dotplotRegion, pathImagen, recorte=2000, numProcesadores=args.procesosFiltro)
+
+        guardarResultadosArchivo(resultadosPrintRegion, nombreArchivo="ReporteTxt/resultadosRegion.txt")
+
+    # Ejecutar en modo k-mer (dotplot disperso) si se especifica en los argumentos
+    if args.kmer is not None and rank == 0:
+        resultadosPrintKmer = []  # Lista para almacenar resultados del modo k-mer
+        vistaKmer = VistaGeneral(formaDotplot) if args.headless else None  # Vista general de todo el dotplot
+        inicioKmer = time.time()  # Marca el inicio del tiempo de procesamiento por k-mers
+        dotplotKmer = kmerDotplot(Secuencia1, Secuencia2, args.kmer, vistaGeneral=vistaKmer)  # Calcula sólo las celdas con k-mers comunes
+        tiempoTotalPacial = time.time() - inicioKmer  # Calcula el tiempo total de ejecución
+        resultadosPrintKmer.append(f"Tiempo de ejecución k-mer (K={args.kmer}): {tiempoTotalPacial}")
+        resultadosPrintKmer.append(f"Coincidencias encontradas: {len(dotplotKmer.coincidencias)}")
+
+        # Graficar el dotplot completo como nube de puntos y filtrar una región rasterizada
+        graficarDotplot(vistaKmer if args.headless else dotplotKmer, figNombre="Imagenes/Kmer/dotplotKmer.png")
+
+        pathImagen = 'Imagenes/Filtradas/dotplotFiltradoKmer.png'
+        filtrarDotplot(dotplotKmer, pathImagen, recorte=2000, numProcesadores=args.procesosFiltro)
+
+        # Calcular tiempo de ejecución en bloque
+        resultadosPrintKmer.append(f"Tiempo de ejecución en bloque k-mer: {tiempoTotalPacial+tiempoFinalNoParalelo}")
+
+        guardarResultadosArchivo(resultadosPrintKmer, nombreArchivo="ReporteTxt/resultadosKmer.txt")
+
+    # Juntar en el rank 0 los tramos de todos los ranks y guardar la traza con un resumen por proceso
+    if args.rutaTraza:
+        eventos = reunirEventosMPI(comm)
+        if rank == 0:
+            guardarTraza(eventos, args.rutaTraza)
+            guardarResultadosArchivo(resumirTraza(eventos), nombreArchivo="ReporteTxt/resumenTraza.txt")
+
 if __name__ == '__main__':
-    main()
+    # --profile se lee antes que el resto para envolver toda la ejecución, también la de los subcomandos benchmark y serve
+    # (cada rank MPI guarda su propio perfil)
+    parserPerfil = argparse.ArgumentParser(add_help=False, allow_abbrev=False)
+    parserPerfil.add_argument('--profile', dest='rutaPerfil', type=str, default=None)
+    argumentosPerfil, restoArgumentos = parserPerfil.parse_known_args()
+    if argumentosPerfil.rutaPerfil:
+        sys.argv = sys.argv[:1] + restoArgumentos  # Los subcomandos tienen sus propios argumentos y no conocen --profile
+        rutaPerfil = argumentosPerfil.rutaPerfil
+        if MPI.COMM_WORLD.Get_size() > 1:
+            rutaPerfil = f"{rutaPerfil}.rank{MPI.COMM_WORLD.Get_rank()}"
+        ejecutarConPerfil(main, rutaPerfil)
+    else:
+        main()
@@ -1,46 +1,178 @@
 import multiprocessing as mp  # Importar multiprocessing para la programación paralela
 import numpy as np  # Importar numpy para operaciones numéricas
 import matplotlib.pyplot as plt  # Importar pyplot para graficar
-from tqdm import tqdm  # Importar tqdm para mostrar una barra de progreso
+from multiprocessing import shared_memory  # Importar memoria compartida entre procesos
+import Perfilado  # Para consultar si la traza está activa
+from Perfilado import barraProgreso, medirTramo, activarTraza, recogerEventos, agregarEventos  # Barra de progreso y tramos de la traza
+from Kernel import codificarSecuencia, calcularBandaDotplot, dividirEnBloques, crearDotplotSalida, envolverDotplot, formaSalida  # Kernel vectorizado del dotplot
+from Utilidades import mostrarFigura  # Mostrar figuras respetando el modo headless
+from VistaGeneral import VistaGeneral  # Vista general acumulada mientras se calcula
+
+codigosWorker = None  # Secuencias codificadas que recibe cada worker una sola vez al iniciar
+dotplotWorker = None  # Memmap de salida del worker cuando el dotplot se escribe en disco
+empaquetadoWorker = False  # Si el worker guarda las coincidencias empaquetadas en bits
+geometriaVistaWorker = None  # (forma, tamano) de la vista general, si se está construyendo una
+ventanaDiagonalWorker = None  # (tamanoVentana, minimoCoincidencias) del modo por ventanas, si se usa
+
+# Función que inicializa cada worker con las secuencias codificadas y, si hay, el archivo de salida
+def inicializarWorkerMultiprocessing(codigos1, codigos2, rutaSalida, empaquetado=False, geometriaVista=None, ventanaDiagonal=None,
+                                     trazaActiva=False):
+    global codigosWorker, dotplotWorker, empaquetadoWorker, geometriaVistaWorker, ventanaDiagonalWorker
+    codigosWorker = (codigos1, codigos2)
+    empaquetadoWorker = empaquetado
+    geometriaVistaWorker = geometriaVista
+    ventanaDiagonalWorker = ventanaDiagonal
+    dotplotWorker = np.load(rutaSalida, mmap_mode="r+") if rutaSalida is not None else None
+    if trazaActiva:
+        activarTraza("worker multiprocessing")  # Cada worker registra sus tramos y los devuelve con cada bloque
 
 # Función para el trabajo realizado por cada proceso en multiprocessing
 def workerMultiprocessing(args):
-    i, secuencia1, secuencia2 = args  # Desempaquetar los argumentos
-    dotplot = np.empty(len(secuencia2), dtype=np.uint8)  # Crear un array vacío para almacenar el dotplot
-    for j in range(len(secuencia2)):
-        # Comparar caracteres de secuencia1 y secuencia2 para calcular el dotplot
-        if secuencia1[i] == secuencia2[j]:
-            if i == j:
-                dotplot[j] = np.uint8(2)  # Si coinciden en la diagonal principal
-            else:
-                dotplot[j] = np.uint8(1)  # Si coinciden fuera de la diagonal principal
-        else:
-            dotplot[j] = np.uint8(0)  # Si no coinciden
-    return dotplot  # Devolver el dotplot calculado
+    inicio, fin = args  # Desempaquetar los argumentos
+    codigos1, codigos2 = codigosWorker
+    # Vista general parcial que sólo cubre las filas de este bloque (unos pocos píxeles de alto)
+    vistaParcial = VistaGeneral(*geometriaVistaWorker, filas=(inicio, fin)) if geometriaVistaWorker is not None else None
+    if dotplotWorker is not None:
+        # Escribir el bloque de filas directamente en el archivo de salida; no se devuelve la matriz por el pipe
+        calcularBandaDotplot(codigos1, codigos2, inicio, fin, dotplotWorker[inicio:fin], empaquetadoWorker, vistaParcial,
+                             ventanaDiagonalWorker)
+        return inicio, None, vistaParcial, recogerEventos()
+    # Calcular el bloque de filas [inicio, fin) con comparaciones vectorizadas (8 veces menos datos de vuelta si se empaqueta)
+    bloque = crearDotplotSalida((fin - inicio, len(codigos2)), empaquetado=empaquetadoWorker)
+    bloque = calcularBandaDotplot(codigos1, codigos2, inicio, fin, bloque, empaquetadoWorker, vistaParcial, ventanaDiagonalWorker)
+    return inicio, bloque, vistaParcial, recogerEventos()
 
 # Función para paralelizar el cálculo de dotplot utilizando multiprocessing
-def paralelizarMultiprocessingDotplot(secuencia1, secuencia2, numProcesadores=mp.cpu_count()):
-    tarea = [(i, secuencia1, secuencia2) for i in range(len(secuencia1))]  # Crear tareas para cada índice de secuencia1
-    with mp.Pool(processes=numProcesadores) as pool:  # Crear un pool de procesos
-        dotplot = []  # Lista para almacenar los resultados del dotplot
-        for resultado in tqdm(pool.imap(workerMultiprocessing, tarea), total=len(tarea)):
-            dotplot.append(resultado)  # Añadir cada resultado a la lista
-    return np.array(dotplot, dtype=np.uint8)  # Devolver la matriz de dotplot como un array numpy de tipo uint8
+# Con rutaSalida el dotplot se escribe en un archivo .npy mapeado en memoria en lugar de la RAM
+# Con empaquetado=True cada celda ocupa un bit y se devuelve un DotplotEmpaquetado
+# Con vistaGeneral cada worker reduce sus teselas y la vista se completa a medida que llegan los resultados
+# Con ventanaDiagonal=(tamanoVentana, minimoCoincidencias) sólo se marcan las celdas cuya ventana diagonal supera el umbral
+def paralelizarMultiprocessingDotplot(secuencia1, secuencia2, numProcesadores=mp.cpu_count(), rutaSalida=None, empaquetado=False,
+                                      vistaGeneral=None, ventanaDiagonal=None):
+    # Codificar ambas secuencias una sola vez como arreglos uint8
+    codigos1 = codificarSecuencia(secuencia1)
+    codigos2 = codificarSecuencia(secuencia2)
+
+    dotplot = crearDotplotSalida((len(codigos1), len(codigos2)), rutaSalida, empaquetado)  # Matriz (o memmap) para el dotplot completo
+    tarea = dividirEnBloques(0, len(codigos1))  # Una tarea por bloque de filas
+    geometriaVista = (vistaGeneral.forma, vistaGeneral.tamano) if vistaGeneral is not None else None
+    with mp.Pool(processes=numProcesadores, initializer=inicializarWorkerMultiprocessing,
+                 initargs=(codigos1, codigos2, rutaSalida, empaquetado, geometriaVista, ventanaDiagonal,
+                           Perfilado.trazaActiva)) as pool:  # Crear un pool de procesos
+        for inicio, bloque, vistaParcial, eventos in barraProgreso(pool.imap_unordered(workerMultiprocessing, tarea), total=len(tarea)):
+            agregarEventos(eventos)
+            if bloque is not None:
+                with medirTramo("recepcion", filas=(inicio, inicio + len(bloque))):
+                    dotplot[inicio:inicio + len(bloque)] = bloque  # Copiar cada bloque en su posición
+            if vistaParcial is not None:
+                vistaGeneral.combinar(vistaParcial)
+    return envolverDotplot(dotplot, len(codigos2), empaquetado)  # Devolver la matriz de dotplot como un array numpy de tipo uint8
+
+# Función para crear un arreglo numpy respaldado por un bloque de memoria compartida
+def crearArregloCompartido(forma, dtype=np.uint8):
+    tamano = max(int(np.prod(forma)) * np.dtype(dtype).itemsize, 1)  # SharedMemory no admite tamaño 0
+    memoria = shared_memory.SharedMemory(create=True, size=tamano)
+    return memoria, np.ndarray(forma, dtype=dtype, buffer=memoria.buf)
+
+# Clase que mantiene en memoria compartida las secuencias codificadas y la matriz de salida
+# Con rutaSalida la matriz de salida es un archivo .npy mapeado en memoria que los workers abren por su cuenta
+class DotplotCompartido:
+    def __init__(self, secuencia1, secuencia2, rutaSalida=None, empaquetado=False, ventanaDiagonal=None):
+        codigos1 = codificarSecuencia(secuencia1)
+        codigos2 = codificarSecuencia(secuencia2)
+
+        # Copiar las secuencias codificadas una sola vez a memoria compartida
+        self.memoria1, self.codigos1 = crearArregloCompartido(codigos1.shape)
+        self.memoria2, self.codigos2 = crearArregloCompartido(codigos2.shape)
+        self.codigos1[:] = codigos1
+        self.codigos2[:] = codigos2
+
+        # La matriz de salida también es compartida; los workers escriben directamente en ella
+        self.rutaSalida = rutaSalida
+        self.empaquetado = empaquetado
+        self.ventanaDiagonal = ventanaDiagonal
+        self.forma = (len(codigos1), len(codigos2))
+        if rutaSalida is None:
+            self.memoriaSalida, self.dotplot = crearArregloCompartido(formaSalida(self.forma, empaquetado))
+        else:
+            self.memoriaSalida, self.dotplot = None, crearDotplotSalida(self.forma, rutaSalida, empaquetado)
+
+    # Nombres, ruta y tamaños que necesita un worker para adjuntarse a la memoria compartida
+    def descriptor(self):
+        nombreSalida = self.memoriaSalida.name if self.memoriaSalida is not None else None
+        return (self.memoria1.name, self.memoria2.name, nombreSalida, self.rutaSalida, self.forma, self.empaquetado, self.ventanaDiagonal)
+
+    # Liberar los bloques de memoria compartida
+    def liberar(self):
+        self.codigos1 = self.codigos2 = self.dotplot = None
+        for memoria in (self.memoria1, self.memoria2, self.memoriaSalida):
+            if memoria is None:
+                continue
+            try:
+                memoria.close()
+            except BufferError:
+                pass  # Aún hay vistas vivas (p. ej. en una figura); el bloque se libera al recolectarlas
+            memoria.unlink()
+
+# Función para el trabajo de cada proceso en el modo de memoria compartida
+def workerMultiprocessingCompartido(args):
+    (nombre1, nombre2, nombreSalida, rutaSalida, forma, empaquetado, ventanaDiagonal), inicioFila, finFila, geometriaVista = args  # Desempaquetar los argumentos
+    vistaParcial = VistaGeneral(*geometriaVista, filas=(inicioFila, finFila)) if geometriaVista is not None else None
+
+    # Adjuntarse a la memoria compartida; sólo viajan nombres y coordenadas, nunca las secuencias ni los resultados
+    memorias = [shared_memory.SharedMemory(name=nombre) for nombre in (nombre1, nombre2, nombreSalida) if nombre is not None]
+    try:
+        codigos1 = np.ndarray((forma[0],), dtype=np.uint8, buffer=memorias[0].buf)
+        codigos2 = np.ndarray((forma[1],), dtype=np.uint8, buffer=memorias[1].buf)
+        if rutaSalida is None:
+            dotplot = np.ndarray(formaSalida(forma, empaquetado), dtype=np.uint8, buffer=memorias[2].buf)
+        else:
+            dotplot = np.load(rutaSalida, mmap_mode="r+")
+
+        # Escribir la banda tesela a tesela directamente en la matriz de salida compartida
+        calcularBandaDotplot(codigos1, codigos2, inicioFila, finFila, dotplot[inicioFila:finFila], empaquetado, vistaParcial,
+                             ventanaDiagonal)
+        del codigos1, codigos2, dotplot  # Soltar las vistas antes de cerrar la memoria
+    finally:
+        for memoria in memorias:
+            memoria.close()
+    return vistaParcial, recogerEventos()
+
+# Función para crear el pool de procesos una sola vez y reutilizarlo en todo el barrido
+def crearPoolMultiprocessing(numProcesadores=mp.cpu_count()):
+    if Perfilado.trazaActiva:
+        return mp.Pool(processes=numProcesadores, initializer=activarTraza, initargs=("worker memoria compartida",))
+    return mp.Pool(processes=numProcesadores)
+
+# Función para calcular el dotplot con un pool ya creado usando sólo numProcesadores workers a la vez
+def paralelizarMultiprocessingCompartido(compartido, pool, numProcesadores=mp.cpu_count(), vistaGeneral=None):
+    forma = compartido.forma
+    geometriaVista = (vistaGeneral.forma, vistaGeneral.tamano) if vistaGeneral is not None else None
+
+    # Repartir las filas en numProcesadores bandas contiguas: a lo sumo numProcesadores workers trabajan a la vez
+    tarea = [(compartido.descriptor(), i * forma[0] // numProcesadores, (i + 1) * forma[0] // numProcesadores, geometriaVista)
+             for i in range(numProcesadores)]
+
+    for vistaParcial, eventos in barraProgreso(pool.imap_unordered(workerMultiprocessingCompartido, tarea), total=len(tarea)):
+        agregarEventos(eventos)
+        if vistaParcial is not None:
+            vistaGeneral.combinar(vistaParcial)
+    return envolverDotplot(compartido.dotplot, forma[1], compartido.empaquetado)
 
 # Función para graficar el análisis de tiempos, aceleraciones y eficiencias usando multiprocessing
 def graficarAnalisisMultiprocessing(tiempos, aceleraciones, eficiencias, numProcesadores):
     print("Generando gráficas de Multiprocessing...")  # Mensaje de estado
     print(f"Tiempo: {tiempos} Aceleración: {aceleraciones} Eficiencia: {eficiencias} Número de procesadores: {numProcesadores}")
-    
+
     # Configurar la figura
     plt.figure(figsize=(10, 10))
-    
+
     # Subtrama 1: gráfico de tiempos vs número de procesadores
     plt.subplot(1, 2, 1)
     plt.plot(numProcesadores, tiempos)
     plt.xlabel("Número de procesadores")
     plt.ylabel("Tiempo")
-    
+
     # Subtrama 2: gráfico de aceleraciones y eficiencias vs número de procesadores
     plt.subplot(1, 2, 2)
     plt.plot(numProcesadores, aceleraciones)
@@ -48,9 +180,9 @@ def graficarAnalisisMultiprocessing(tiempos, aceleraciones, eficiencias, numProc
     plt.xlabel("Número de procesadores")
     plt.ylabel("Aceleración y Eficiencia")
     plt.legend(["Aceleración", "Eficiencia"])
-    
+
     # Guardar la figura como un archivo de imagen
     plt.savefig("Imagenes/Multiprocessing/graficasMultiprocessing.png")
 
     # Mostrar la figura en pantalla
-    plt.show()
+    mostrarFigura()
@@ -0,0 +1,104 @@
+import cProfile  # Importar cProfile para perfilar una ejecución completa
+import json  # Importar json para exportar la traza
+import os  # Importar os para identificar cada proceso
+import pstats  # Importar pstats para resumir el perfil
+import threading  # Importar threading para identificar cada hilo
+import time  # Importar time para las marcas de tiempo de la traza
+from contextlib import contextmanager  # Para definir los tramos con "with"
+from tqdm import tqdm  # Importar tqdm para las barras de progreso
+
+trazaActiva = False  # Los tramos sólo se registran si la traza está activada (--trace)
+eventosTraza = []  # Eventos de este proceso en formato Chrome trace
+nombreProceso = None  # Nombre del proceso en la traza (p. ej. "rank 1" en MPI)
+mostrarProgreso = True  # Las barras de tqdm se pueden apagar (--no_progress) para no sumar su costo a las mediciones
+
+# Función para activar el registro de tramos en este proceso (también se usa como initializer de los pools)
+# Vacía la lista de eventos: un worker creado con fork no debe devolver los eventos que heredó del padre
+def activarTraza(nombre=None):
+    global trazaActiva, nombreProceso
+    trazaActiva = True
+    nombreProceso = nombre
+    eventosTraza.clear()
+
+# Función para obtener la memoria propia actual del proceso en KB (páginas privadas de /proc/self/smaps_rollup en Linux),
+# o None si no se puede medir. No se usa ru_maxrss ni la memoria residente: un worker creado con fork hereda el máximo
+# del padre y comparte sus páginas, así todos parecerían usar lo mismo que el padre
+def memoriaActualKb():
+    try:
+        with open("/proc/self/smaps_rollup") as archivo:
+            return sum(int(linea.split()[1]) for linea in archivo if linea.startswith(("Private_Clean:", "Private_Dirty:")))
+    except (OSError, ValueError):
+        return None
+
+# Función para medir un tramo con nombre: with medirTramo("computo", filas=(0, 256)): ...
+# Con la traza desactivada no registra nada, así se puede dejar en el código sin costo apreciable
+@contextmanager
+def medirTramo(nombre, **argumentos):
+    if not trazaActiva:
+        yield
+        return
+    memoriaInicio = memoriaActualKb()
+    inicio = time.time()  # Reloj de pared: comparable entre procesos y ranks de la misma máquina
+    try:
+        yield
+    finally:
+        fin = time.time()
+        # Memoria propia del proceso al empezar y al terminar el tramo (la mayor de las dos)
+        argumentos["memoriaKb"] = max(memoriaInicio, memoriaActualKb()) if memoriaInicio is not None else None
+        eventosTraza.append({"name": nombre, "ph": "X", "ts": inicio * 1e6, "dur": (fin - inicio) * 1e6,
+                             "pid": os.getpid(), "tid": threading.get_ident(), "args": argumentos})
+
+# Función para sacar los eventos registrados en este proceso (los workers los devuelven con su resultado)
+def recogerEventos():
+    global eventosTraza
+    if not trazaActiva:
+        return []
+    eventos, eventosTraza = eventosTraza, []
+    if nombreProceso is not None:
+        eventos.append({"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": nombreProceso}})
+    return eventos
+
+# Función para agregar a este proceso los eventos que devolvió un worker
+def agregarEventos(eventos):
+    if eventos:
+        eventosTraza.extend(eventos)
+
+# Función para juntar en el rank 0 los eventos de todos los procesos MPI del comunicador
+def reunirEventosMPI(comm):
+    eventos = comm.gather(recogerEventos(), root=0)
+    return [evento for eventosRank in eventos for evento in eventosRank] if comm.Get_rank() == 0 else None
+
+# Función para resumir la traza por proceso: tiempo total de cada tramo y memoria máxima observada (muestra el desbalance de carga)
+def resumirTraza(eventos):
+    resumen = {}
+    for evento in eventos:
+        if evento["ph"] != "X":
+            continue
+        proceso = resumen.setdefault(evento["pid"], {"tramos": {}, "memoriaMaximaKb": 0})
+        proceso["tramos"][evento["name"]] = proceso["tramos"].get(evento["name"], 0.0) + evento["dur"] / 1e6
+        proceso["memoriaMaximaKb"] = max(proceso["memoriaMaximaKb"], evento["args"].get("memoriaKb") or 0)
+    lineas = []
+    for pid, proceso in sorted(resumen.items()):
+        tramos = ", ".join(f"{nombre}={segundos:.4f}s" for nombre, segundos in sorted(proceso["tramos"].items()))
+        lineas.append(f"Proceso {pid}: {tramos}; memoria propia máxima observada {proceso['memoriaMaximaKb']} KB")
+    return lineas
+
+# Función para guardar los eventos como traza JSON de Chrome (se abre en chrome://tracing o en Perfetto)
+def guardarTraza(eventos, rutaTraza):
+    os.makedirs(os.path.dirname(rutaTraza) or ".", exist_ok=True)
+    with open(rutaTraza, "w") as archivo:
+        json.dump({"traceEvents": eventos, "displayTimeUnit": "ms"}, archivo)
+
+# Función para ejecutar una función bajo cProfile, guardar las estadísticas en rutaPerfil y mostrar las más costosas
+def ejecutarConPerfil(funcion, rutaPerfil, numFunciones=25):
+    perfil = cProfile.Profile()
+    try:
+        return perfil.runcall(funcion)
+    finally:
+        perfil.dump_stats(rutaPerfil)
+        pstats.Stats(perfil).sort_stats("cumulative").print_stats(numFunciones)
+        print(f"Perfil guardado en {rutaPerfil} (ábralo con python -m pstats o snakeviz)")
+
+# Función para envolver un iterable en una barra de progreso que se refresca a lo sumo dos veces por segundo
+def barraProgreso(iterable, total=None):
+    return tqdm(iterable, total=total, disable=not mostrarProgreso, mininterval=0.5)
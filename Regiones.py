@@ -0,0 +1,126 @@
+import argparse  # Importar argparse para informar regiones inválidas desde la línea de comandos
+import hashlib  # Importar hashlib para las claves por contenido
+import multiprocessing as mp  # Importar multiprocessing para calcular las teselas que faltan en paralelo
+import os  # Importar os para rutas y carpetas
+import numpy as np  # Importar numpy para operaciones numéricas
+from Perfilado import barraProgreso  # Importar la barra de progreso
+from Kernel import codificarSecuencia, calcularCoincidencias, marcarDiagonalBloque  # Kernel compartido con los demás backends
+from Empaquetado import empaquetarBloque  # Almacenamiento en bits
+
+tamanoTeselaRegion = 2048  # Lado de las teselas de la grilla alineada (múltiplo de 8 para empaquetar en bits)
+carpetaAlmacenTeselas = ".cache_teselas"  # Carpeta del almacén persistente de teselas
+
+# Función para leer una región "inicio:fin" de la línea de comandos; cualquiera de los dos extremos puede omitirse
+# Se usa como type= de argparse, así los errores se muestran con su mensaje
+def leerRegion(texto):
+    partes = texto.split(":")
+    if len(partes) != 2 or not all(parte.isdigit() for parte in partes if parte):
+        raise argparse.ArgumentTypeError(f"Región inválida '{texto}': use inicio:fin con enteros no negativos")
+    inicio = int(partes[0]) if partes[0] else 0
+    fin = int(partes[1]) if partes[1] else None
+    if fin is not None and fin <= inicio:
+        raise argparse.ArgumentTypeError(f"Región inválida '{texto}': se necesita 0 <= inicio < fin")
+    return inicio, fin
+
+# Función para calcular el hash del contenido de una secuencia codificada (clave de sus teselas)
+def hashSecuencia(codigos):
+    return hashlib.sha1(np.ascontiguousarray(codigos)).hexdigest()
+
+# Función que calcula una tesela de la grilla como bits empaquetados (la diagonal se marca al armar la ventana)
+# Sólo necesita los fragmentos de las secuencias (unos pocos KB), así es barato enviarla a otro proceso
+def calcularTeselaRegion(fragmento1, fragmento2):
+    return empaquetarBloque(calcularCoincidencias(fragmento1, fragmento2, 0, len(fragmento1)))
+
+# Función para el trabajo de cada proceso del pool: calcular una tesela y devolverla con su clave
+def workerTeselaRegion(args):
+    clave, fragmento1, fragmento2 = args
+    return clave, calcularTeselaRegion(fragmento1, fragmento2)
+
+# Función para calcular las teselas de la grilla alineada que cubren [inicio, fin)
+def indicesTeselas(inicio, fin, tamanoTesela=tamanoTeselaRegion):
+    return range(inicio // tamanoTesela, -(-fin // tamanoTesela))
+
+# Función para obtener los fragmentos de las secuencias que necesita la tesela (filaTesela, columnaTesela)
+def fragmentosTesela(codigos1, codigos2, filaTesela, columnaTesela, tamanoTesela=tamanoTeselaRegion):
+    return (codigos1[filaTesela * tamanoTesela:(filaTesela + 1) * tamanoTesela],
+            codigos2[columnaTesela * tamanoTesela:(columnaTesela + 1) * tamanoTesela])
+
+# Función para copiar en la ventana la parte de una tesela que cae dentro de ella
+def copiarTeselaEnVentana(salida, bits, filaTesela, columnaTesela, ventana, tamanoTesela=tamanoTeselaRegion):
+    inicio1, fin1, inicio2, fin2 = ventana
+    inicioFila, inicioColumna = filaTesela * tamanoTesela, columnaTesela * tamanoTesela
+    desdeFila, hastaFila = max(inicio1, inicioFila), min(fin1, inicioFila + bits.shape[0])
+    desdeColumna, hastaColumna = max(inicio2, inicioColumna), min(fin2, inicioColumna + tamanoTesela)
+    region = np.unpackbits(bits[desdeFila - inicioFila:hastaFila - inicioFila], axis=1)
+    salida[desdeFila - inicio1:hastaFila - inicio1, desdeColumna - inicio2:hastaColumna - inicio2] = \
+        region[:, desdeColumna - inicioColumna:hastaColumna - inicioColumna]
+
+# Clase que guarda teselas en disco, una por archivo .npy, para reutilizarlas entre ejecuciones
+# Tiene la misma interfaz obtener/guardar que la caché LRU del servicio, así se pueden usar juntas
+class AlmacenTeselas:
+    def __init__(self, carpeta=carpetaAlmacenTeselas, tamanoTesela=tamanoTeselaRegion):
+        self.carpeta = carpeta
+        self.tamanoTesela = tamanoTesela
+
+    # Función para calcular la ruta de la tesela (hash1, hash2, fila, columna)
+    def rutaTesela(self, clave):
+        hash1, hash2, filaTesela, columnaTesela = clave
+        return os.path.join(self.carpeta, f"{hash1}_{hash2}_{self.tamanoTesela}", f"{filaTesela}_{columnaTesela}.npy")
+
+    # Función para obtener una tesela guardada (o None si todavía no se calculó)
+    def obtener(self, clave):
+        ruta = self.rutaTesela(clave)
+        return np.load(ruta) if os.path.exists(ruta) else None
+
+    # Función para guardar una tesela; la escritura es atómica para que otro proceso nunca lea un archivo a medias
+    def guardar(self, clave, bits):
+        ruta = self.rutaTesela(clave)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        rutaTemporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(rutaTemporal, "wb") as archivo:
+            np.save(archivo, bits)
+        os.replace(rutaTemporal, ruta)
+
+# Función para calcular sólo la ventana region1 x region2 del dotplot de las secuencias completas
+# Las teselas de la grilla que ya estén en el almacén se reutilizan; las que faltan se calculan (en paralelo) y se guardan,
+# así hacer zoom sobre una comparación grande sólo cuesta las teselas nuevas.
+# Devuelve la ventana densa (0/1/2 con la diagonal global marcada) y un resumen con la ventana y las teselas reutilizadas
+def calcularRegion(secuencia1, secuencia2, region1, region2, almacen=None, numProcesadores=1, rutaSalida=None):
+    codigos1 = codificarSecuencia(secuencia1)
+    codigos2 = codificarSecuencia(secuencia2)
+    almacen = almacen if almacen is not None else AlmacenTeselas()
+    hash1, hash2 = hashSecuencia(codigos1), hashSecuencia(codigos2)
+
+    # Recortar la ventana a las secuencias; fin None significa hasta el final
+    ventana = (region1[0], min(region1[1] or len(codigos1), len(codigos1)), region2[0], min(region2[1] or len(codigos2), len(codigos2)))
+    if ventana[0] >= ventana[1] or ventana[2] >= ventana[3]:
+        raise ValueError(f"La región {region1} x {region2} queda fuera de las secuencias ({len(codigos1)} x {len(codigos2)})")
+    forma = (ventana[1] - ventana[0], ventana[3] - ventana[2])
+    salida = np.zeros(forma, dtype=np.uint8) if rutaSalida is None else \
+        np.lib.format.open_memmap(rutaSalida, mode="w+", dtype=np.uint8, shape=forma)
+
+    # Copiar las teselas ya guardadas y anotar las que faltan
+    faltantes = []
+    teselas = [(hash1, hash2, filaTesela, columnaTesela) for filaTesela in indicesTeselas(ventana[0], ventana[1], almacen.tamanoTesela)
+               for columnaTesela in indicesTeselas(ventana[2], ventana[3], almacen.tamanoTesela)]
+    for clave in teselas:
+        bits = almacen.obtener(clave)
+        if bits is None:
+            faltantes.append(clave)
+        else:
+            copiarTeselaEnVentana(salida, bits, clave[2], clave[3], ventana, almacen.tamanoTesela)
+
+    # Calcular las teselas que faltan; cada una se guarda en el almacén apenas llega
+    tareas = ((clave,) + fragmentosTesela(codigos1, codigos2, clave[2], clave[3], almacen.tamanoTesela) for clave in faltantes)
+    if numProcesadores > 1 and len(faltantes) > 1:
+        with mp.Pool(processes=numProcesadores) as pool:
+            for clave, bits in barraProgreso(pool.imap_unordered(workerTeselaRegion, tareas), total=len(faltantes)):
+                almacen.guardar(clave, bits)
+                copiarTeselaEnVentana(salida, bits, clave[2], clave[3], ventana, almacen.tamanoTesela)
+    else:
+        for clave, bits in barraProgreso(map(workerTeselaRegion, tareas), total=len(faltantes)):
+            almacen.guardar(clave, bits)
+            copiarTeselaEnVentana(salida, bits, clave[2], clave[3], ventana, almacen.tamanoTesela)
+
+    marcarDiagonalBloque(salida, *ventana)  # La ventana es un bloque con índices globales: la diagonal i == j vale 2
+    return salida, {"ventana": ventana, "teselas": len(teselas), "teselasReutilizadas": len(teselas) - len(faltantes)}
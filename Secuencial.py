@@ -1,26 +1,30 @@
-from tqdm import tqdm  # Importar la barra de progreso
+from Perfilado import barraProgreso  # Importar la barra de progreso
 import numpy as np  # Importar numpy para operaciones numéricas
+import Utilidades  # Para consultar el modo headless
+from Kernel import codificarSecuencia, calcularBandaDotplot, dividirEnBloques, crearDotplotSalida, envolverDotplot  # Kernel vectorizado del dotplot
 
 # Función para calcular el dotplot de manera secuencial
-def sequentialDotplot(sequence1, sequence2):
-    # Crear una matriz vacía para almacenar el dotplot
-    dotplot = np.empty((len(sequence1), len(sequence2)), dtype=np.uint8)
-    
-    # Iterar sobre los índices de las secuencias y calcular el dotplot
-    for i in tqdm(range(len(sequence1))):  # Usar tqdm para mostrar una barra de progreso
-        for j in range(len(sequence2)):
-            # Comparar caracteres de sequence1 y sequence2 para calcular el dotplot
-            if sequence1[i] == sequence2[j]:
-                if i == j:
-                    dotplot[i, j] = np.uint8(2)  # Si coinciden en la diagonal principal
-                else:
-                    dotplot[i, j] = np.uint8(1)  # Si coinciden fuera de la diagonal principal
-            else:
-                dotplot[i, j] = np.uint8(0)  # Si no coinciden
+# Con rutaSalida el dotplot se escribe en un archivo .npy mapeado en memoria en lugar de la RAM
+# Con empaquetado=True cada celda ocupa un bit y se devuelve un DotplotEmpaquetado
+# Con vistaGeneral cada tesela se acumula en la vista general a medida que se calcula
+# Con ventanaDiagonal=(tamanoVentana, minimoCoincidencias) sólo se marcan las celdas cuya ventana diagonal supera el umbral
+def sequentialDotplot(sequence1, sequence2, rutaSalida=None, empaquetado=False, vistaGeneral=None, ventanaDiagonal=None):
+    # Codificar ambas secuencias una sola vez como arreglos uint8
+    codigos1 = codificarSecuencia(sequence1)
+    codigos2 = codificarSecuencia(sequence2)
+
+    # Crear una matriz vacía (o un memmap en disco) para almacenar el dotplot
+    dotplot = crearDotplotSalida((len(codigos1), len(codigos2)), rutaSalida, empaquetado)
+
+    # Llenar el dotplot por bloques de filas; cada bloque se calcula tesela a tesela con comparaciones vectorizadas
+    for inicio, fin in barraProgreso(dividirEnBloques(0, len(codigos1))):  # Mostrar una barra de progreso
+        calcularBandaDotplot(codigos1, codigos2, inicio, fin, dotplot[inicio:fin], empaquetado, vistaGeneral, ventanaDiagonal)
+    dotplot = envolverDotplot(dotplot, len(codigos2), empaquetado)
 
     # Imprimir mensaje de finalización y mostrar la matriz dotplot
     print("Dotplot secuencial terminado")
-    print(dotplot)
+    if not Utilidades.modoHeadless:
+        print(dotplot)
 
     # Devolver la matriz dotplot calculada
     return dotplot
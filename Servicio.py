@@ -0,0 +1,285 @@
+import argparse  # Importar argparse para los argumentos del subcomando
+import asyncio  # Importar asyncio para atender varias conexiones a la vez
+import functools  # Importar functools para pasar argumentos con nombre al executor
+import hashlib  # Importar hashlib para las claves por contenido
+import json  # Importar json para el protocolo de mensajes
+import os  # Importar os para rutas y carpetas
+import time  # Importar time para medir cada trabajo
+from collections import OrderedDict  # Diccionario ordenado para la caché LRU
+from concurrent.futures import ProcessPoolExecutor  # Pool de procesos compartido por todos los trabajos
+import numpy as np  # Importar numpy para operaciones numéricas
+from Kmer import kmerDotplot  # Backend disperso por k-mers
+from Utilidades import leerArchivoFasta  # Lectura de FASTA con caché en disco
+from Kernel import marcarDiagonalBloque  # Marca de la diagonal principal con índices globales
+from Regiones import AlmacenTeselas, calcularTeselaRegion, indicesTeselas, fragmentosTesela, copiarTeselaEnVentana, hashSecuencia  # Grilla de teselas compartida con --region1/--region2
+
+carpetaResultadosServicio = "ResultadosServicio"  # Carpeta donde se escribe el resultado de cada trabajo
+celdasMaximasVentana = 256 * 2**20  # Tamaño máximo de la ventana densa que devuelve un trabajo
+backendsServicio = ("dense", "kmer")  # Backends que acepta el servicio
+
+# Clase que guarda valores (arreglos numpy) hasta un tamaño total en bytes y descarta el menos usado recientemente
+class CacheLRU:
+    def __init__(self, capacidadBytes):
+        self.capacidadBytes = capacidadBytes
+        self.bytesUsados = 0
+        self.valores = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+
+    # Función para obtener un valor (o None) y marcarlo como el más reciente
+    def obtener(self, clave):
+        valor = self.valores.get(clave)
+        if valor is None:
+            self.fallos += 1
+            return None
+        self.valores.move_to_end(clave)
+        self.aciertos += 1
+        return valor
+
+    # Función para guardar un valor y descartar los menos recientes hasta volver a la capacidad
+    def guardar(self, clave, valor):
+        if clave in self.valores:
+            self.bytesUsados -= self.valores.pop(clave).nbytes
+        if valor.nbytes > self.capacidadBytes:
+            return  # No cabe ni sola: no vale la pena vaciar la caché por ella
+        self.valores[clave] = valor
+        self.bytesUsados += valor.nbytes
+        while self.bytesUsados > self.capacidadBytes:
+            _, descartado = self.valores.popitem(last=False)
+            self.bytesUsados -= descartado.nbytes
+
+    def __len__(self):
+        return len(self.valores)
+
+# Función para leer una secuencia codificada en memoria junto con el hash de su contenido
+def cargarSecuenciaConHash(nombreArchivo):
+    codigos = np.array(leerArchivoFasta(nombreArchivo))
+    return codigos, hashSecuencia(codigos)
+
+# Función para saber si un valor de un trabajo JSON es un entero (en JSON true/false también son int para Python)
+def esEntero(valor):
+    return isinstance(valor, int) and not isinstance(valor, bool)
+
+# Función para validar un trabajo recibido; cualquier campo con un tipo inesperado se informa como ValueError
+def validarTrabajo(trabajo):
+    if not isinstance(trabajo, dict):
+        raise ValueError("Cada trabajo debe ser un objeto JSON con file1 y file2")
+    for campo in ("file1", "file2"):
+        if not isinstance(trabajo.get(campo), str):
+            raise ValueError(f"El campo '{campo}' es obligatorio y debe ser la ruta de un archivo FASTA")
+    backend = trabajo.get("backend", "dense")
+    if backend not in backendsServicio:
+        raise ValueError(f"Backend desconocido: {backend} (use {', '.join(backendsServicio)})")
+    ventana = trabajo.get("window")
+    if ventana is not None and not (isinstance(ventana, list) and len(ventana) == 4 and all(esEntero(valor) for valor in ventana)):
+        raise ValueError(f"window debe ser una lista de 4 enteros [inicio1, fin1, inicio2, fin2], no {ventana!r}")
+    maxLen = trabajo.get("maxLen", 10000)
+    if maxLen is not None and not (esEntero(maxLen) and maxLen >= 0):
+        raise ValueError(f"maxLen debe ser un entero no negativo, no {maxLen!r}")
+    if not esEntero(trabajo.get("k", 12)):
+        raise ValueError(f"k debe ser un entero, no {trabajo.get('k')!r}")
+    return trabajo
+
+# Función para guardar un arreglo como .npy de forma atómica (igual que AlmacenTeselas.guardar)
+def guardarResultado(rutaResultado, arreglo):
+    rutaTemporal = f"{rutaResultado}.{os.getpid()}.tmp"
+    with open(rutaTemporal, "wb") as archivo:
+        np.save(archivo, arreglo)
+    os.replace(rutaTemporal, rutaResultado)
+
+# Función para terminar la ventana densa escrita en un archivo temporal: marcar la diagonal y publicarla con su nombre final
+def publicarVentana(salida, ventana, rutaTemporal, rutaResultado):
+    marcarDiagonalBloque(salida, *ventana)
+    salida.flush()
+    os.replace(rutaTemporal, rutaResultado)
+
+# Clase del servicio: atiende trabajos por JSON-lines, calcula teselas en un pool compartido y guarda una caché LRU
+# Cada trabajo es un objeto {"file1", "file2", "maxLen", "backend", "window"}; window es [inicio1, fin1, inicio2, fin2]
+class ServicioDotplot:
+    def __init__(self, numProcesos=os.cpu_count(), capacidadCacheBytes=1024 * 2**20, almacen=None):
+        self.almacen = almacen  # Almacén persistente de teselas detrás de la caché en memoria (opcional)
+        self.pool = ProcessPoolExecutor(max_workers=numProcesos)
+        self.cacheSecuencias = CacheLRU(capacidadCacheBytes // 4)  # Secuencias codificadas por (ruta, fecha, tamaño)
+        self.cacheTeselas = CacheLRU(capacidadCacheBytes)  # Teselas por (hash1, hash2, fila, columna)
+        self.hashesSecuencias = {}  # Hash del contenido de cada secuencia cargada
+        self.cacheResultados = {}  # Ruta del resultado de cada trabajo ya calculado, por su clave
+        self.teselasEnCurso = {}  # Teselas que algún trabajo ya está calculando: otros trabajos las esperan
+        self.trabajosEnCurso = {}  # Resultados que algún trabajo ya está escribiendo: los trabajos idénticos los esperan
+        self.numTrabajos = 0
+
+    # Función para cargar una secuencia codificada y su hash de contenido, pasando por la caché
+    async def cargarSecuencia(self, nombreArchivo):
+        estado = os.stat(nombreArchivo)
+        clave = (os.path.abspath(nombreArchivo), estado.st_mtime_ns, estado.st_size)
+        codigos = self.cacheSecuencias.obtener(clave)
+        if codigos is None or clave not in self.hashesSecuencias:
+            # Leer y hashear fuera del bucle de eventos para no bloquear las otras conexiones
+            codigos, self.hashesSecuencias[clave] = await asyncio.get_running_loop().run_in_executor(None, cargarSecuenciaConHash, nombreArchivo)
+            self.cacheSecuencias.guardar(clave, codigos)
+        return codigos, self.hashesSecuencias[clave]
+
+    # Función para leer una tesela del almacén en disco o, si no está, calcularla en el pool y guardarla
+    # La lectura y escritura del almacén se hacen en hilos para no bloquear el bucle de eventos
+    async def cargarOCalcularTesela(self, clave, codigos1, codigos2):
+        bucle = asyncio.get_running_loop()
+        if self.almacen is not None:
+            bits = await bucle.run_in_executor(None, self.almacen.obtener, clave)
+            if bits is not None:
+                self.cacheTeselas.guardar(clave, bits)
+                return bits, True
+        bits = await bucle.run_in_executor(self.pool, calcularTeselaRegion, *fragmentosTesela(codigos1, codigos2, clave[2], clave[3]))
+        self.cacheTeselas.guardar(clave, bits)
+        if self.almacen is not None:
+            await bucle.run_in_executor(None, self.almacen.guardar, clave, bits)
+        return bits, False
+
+    # Función para obtener una tesela: de la caché, de otro trabajo que ya la está buscando, del almacén en disco o del pool
+    async def obtenerTesela(self, codigos1, codigos2, hash1, hash2, filaTesela, columnaTesela):
+        clave = (hash1, hash2, filaTesela, columnaTesela)
+        bits = self.cacheTeselas.obtener(clave)
+        if bits is not None:
+            return bits, True
+        futuro = self.teselasEnCurso.get(clave)
+        if futuro is None:
+            futuro = asyncio.ensure_future(self.cargarOCalcularTesela(clave, codigos1, codigos2))
+            self.teselasEnCurso[clave] = futuro
+            try:
+                return await futuro
+            finally:
+                del self.teselasEnCurso[clave]
+        bits, _ = await asyncio.shield(futuro)  # Un trabajo solapado ya la pidió: se comparte el resultado
+        return bits, True
+
+    # Función para ejecutar un trabajo, llamando a notificar(mensaje) con el progreso
+    async def ejecutarTrabajo(self, trabajo, notificar):
+        inicioTrabajo = time.perf_counter()
+        trabajo = validarTrabajo(trabajo)
+        backend = trabajo.get("backend", "dense")
+        codigos1, hash1 = await self.cargarSecuencia(trabajo["file1"])
+        codigos2, hash2 = await self.cargarSecuencia(trabajo["file2"])
+
+        # Ventana [inicio1, fin1) x [inicio2, fin2); por defecto todo el recorte de maxLen, como en Main
+        maxLen = trabajo.get("maxLen", 10000) or None
+        longitud1, longitud2 = len(codigos1[:maxLen]), len(codigos2[:maxLen])
+        inicio1, fin1, inicio2, fin2 = trabajo.get("window") or (0, longitud1, 0, longitud2)
+        ventana = (max(0, inicio1), min(fin1, longitud1), max(0, inicio2), min(fin2, longitud2))
+        if ventana[0] >= ventana[1] or ventana[2] >= ventana[3]:
+            raise ValueError(f"La ventana {trabajo.get('window')} está vacía para secuencias de {longitud1} x {longitud2}")
+        if backend == "dense" and (ventana[1] - ventana[0]) * (ventana[3] - ventana[2]) > celdasMaximasVentana:
+            raise ValueError(f"La ventana supera {celdasMaximasVentana} celdas; pida una región más pequeña")
+
+        # Un trabajo repetido devuelve el archivo que ya se escribió
+        claveTrabajo = hashlib.sha1(json.dumps([hash1, hash2, backend, ventana, trabajo.get("k", 12)]).encode()).hexdigest()
+        rutaResultado = os.path.join(carpetaResultadosServicio, f"{claveTrabajo}.npy")
+        if self.cacheResultados.get(claveTrabajo) == rutaResultado and os.path.exists(rutaResultado):
+            return {"resultado": rutaResultado, "ventana": ventana, "desdeCache": True, "tiempo": time.perf_counter() - inicioTrabajo}
+
+        # Un trabajo idéntico que ya se está calculando se espera en lugar de escribir el mismo archivo a la vez
+        futuro = self.trabajosEnCurso.get(claveTrabajo)
+        desdeCache = futuro is not None
+        if futuro is None:
+            futuro = asyncio.ensure_future(self.calcularResultado(claveTrabajo, rutaResultado, backend, ventana, trabajo.get("k", 12),
+                                                                  codigos1, codigos2, hash1, hash2, notificar))
+            self.trabajosEnCurso[claveTrabajo] = futuro
+            futuro.add_done_callback(lambda _: self.trabajosEnCurso.pop(claveTrabajo, None))
+        resultado = await asyncio.shield(futuro)  # Si este cliente se va, el cálculo sigue para los demás
+        return {**resultado, "desdeCache": desdeCache, "tiempo": time.perf_counter() - inicioTrabajo}
+
+    # Función para calcular el resultado de un trabajo y publicarlo en rutaResultado (siempre con un reemplazo atómico)
+    async def calcularResultado(self, claveTrabajo, rutaResultado, backend, ventana, k, codigos1, codigos2, hash1, hash2, notificar):
+        bucle = asyncio.get_running_loop()
+        os.makedirs(carpetaResultadosServicio, exist_ok=True)
+
+        if backend == "kmer":
+            # El dotplot disperso de la ventana se calcula entero en el pool; las coincidencias se guardan en coordenadas globales
+            dotplot = await bucle.run_in_executor(self.pool, kmerDotplot, codigos1[ventana[0]:ventana[1]], codigos2[ventana[2]:ventana[3]], k)
+            await bucle.run_in_executor(None, guardarResultado, rutaResultado, dotplot.coincidencias + np.array([ventana[0], ventana[2]]))
+            self.cacheResultados[claveTrabajo] = rutaResultado
+            return {"resultado": rutaResultado, "ventana": ventana, "coincidencias": len(dotplot.coincidencias)}
+
+        # Pedir todas las teselas de la grilla que tocan la ventana y copiarlas a medida que llegan
+        # El archivo se escribe con un nombre temporal y sólo se publica completo; la E/S va en hilos fuera del bucle de eventos
+        rutaTemporal = f"{rutaResultado}.{os.getpid()}.tmp"
+        salida = await bucle.run_in_executor(None, functools.partial(np.lib.format.open_memmap, rutaTemporal, mode="w+", dtype=np.uint8,
+                                                                     shape=(ventana[1] - ventana[0], ventana[3] - ventana[2])))
+        teselas = [(filaTesela, columnaTesela) for filaTesela in indicesTeselas(ventana[0], ventana[1])
+                   for columnaTesela in indicesTeselas(ventana[2], ventana[3])]
+
+        async def tesela(filaTesela, columnaTesela):
+            bits, desdeCache = await self.obtenerTesela(codigos1, codigos2, hash1, hash2, filaTesela, columnaTesela)
+            return filaTesela, columnaTesela, bits, desdeCache
+
+        teselasDesdeCache = 0
+        clienteConectado = True
+        for hechas, pendiente in enumerate(asyncio.as_completed([tesela(*indices) for indices in teselas]), start=1):
+            filaTesela, columnaTesela, bits, desdeCache = await pendiente
+            await bucle.run_in_executor(None, copiarTeselaEnVentana, salida, bits, filaTesela, columnaTesela, ventana)
+            teselasDesdeCache += desdeCache
+            if clienteConectado:
+                try:
+                    await notificar({"evento": "progreso", "teselas": hechas, "total": len(teselas), "desdeCache": teselasDesdeCache})
+                except ConnectionError:
+                    clienteConectado = False  # El trabajo sigue: otros clientes idénticos pueden estar esperándolo
+        await bucle.run_in_executor(None, publicarVentana, salida, ventana, rutaTemporal, rutaResultado)
+        del salida
+        self.cacheResultados[claveTrabajo] = rutaResultado
+        return {"resultado": rutaResultado, "ventana": ventana, "teselas": len(teselas), "teselasDesdeCache": teselasDesdeCache}
+
+    # Función que atiende una conexión: cada línea es un trabajo JSON y cada respuesta es una línea JSON
+    async def atenderConexion(self, lector, escritor):
+        async def notificar(mensaje):
+            escritor.write((json.dumps(mensaje) + "\n").encode())
+            await escritor.drain()
+
+        try:
+            while linea := await lector.readline():
+                if not linea.strip():
+                    continue
+                self.numTrabajos += 1
+                idTrabajo = self.numTrabajos
+                try:
+                    trabajo = json.loads(linea)
+                    await notificar({"evento": "aceptado", "trabajo": idTrabajo})
+                    resultado = await self.ejecutarTrabajo(trabajo, notificar)
+                    await notificar({"evento": "resultado", "trabajo": idTrabajo, **resultado})
+                except (ValueError, KeyError, TypeError, OSError) as e:
+                    await notificar({"evento": "error", "trabajo": idTrabajo, "mensaje": f"{type(e).__name__}: {e}"})
+        except ConnectionError:
+            pass  # El cliente se desconectó a mitad de un trabajo
+        finally:
+            escritor.close()
+
+    # Función para liberar el pool al cerrar el servicio
+    def cerrar(self):
+        self.pool.shutdown(cancel_futures=True)
+
+# Función para arrancar el servicio en un puerto TCP local o en un socket Unix
+async def iniciarServicio(servicio, host="127.0.0.1", puerto=8765, rutaSocket=None):
+    if rutaSocket is not None:
+        servidor = await asyncio.start_unix_server(servicio.atenderConexion, path=rutaSocket)
+        print(f"Servicio de dotplot escuchando en {rutaSocket}")
+    else:
+        servidor = await asyncio.start_server(servicio.atenderConexion, host, puerto)
+        print(f"Servicio de dotplot escuchando en {host}:{puerto}")
+    async with servidor:
+        await servidor.serve_forever()
+
+# Función principal del subcomando serve: python Main.py serve [--port=8765 | --socket=ruta] [--workers=N]
+def ejecutarServicio(argumentos):
+    parser = argparse.ArgumentParser(prog="Main.py serve", description="Servicio de trabajos de dotplot (JSON-lines)")
+    parser.add_argument('--host', dest='host', type=str, default="127.0.0.1", help='Dirección en la que escuchar')
+    parser.add_argument('--port', dest='puerto', type=int, default=8765, help='Puerto TCP en el que escuchar')
+    parser.add_argument('--socket', dest='rutaSocket', type=str, default=None, help='Escuchar en un socket Unix en lugar de TCP')
+    parser.add_argument('--workers', dest='numProcesos', type=int, default=os.cpu_count(), help='Procesos del pool compartido')
+    parser.add_argument('--tile_store', dest='carpetaAlmacen', type=str, default=None, help='Carpeta del almacén persistente de teselas (el mismo de --region1/--region2)')
+    parser.add_argument('--cache_mb', dest='cacheMb', type=int, default=1024, help='Memoria máxima de la caché de teselas (MB)')
+    args = parser.parse_args(argumentos)
+
+    almacen = AlmacenTeselas(args.carpetaAlmacen) if args.carpetaAlmacen is not None else None
+    servicio = ServicioDotplot(args.numProcesos, args.cacheMb * 2**20, almacen)
+    try:
+        asyncio.run(iniciarServicio(servicio, args.host, args.puerto, args.rutaSocket))
+    except KeyboardInterrupt:
+        print("Servicio detenido")
+    finally:
+        servicio.cerrar()
@@ -1,28 +1,93 @@
 import numpy as np
-from Bio import SeqIO
 import matplotlib.pyplot as plt
 import cv2
+import hashlib
+import os
 import time
+from Kmer import DotplotDisperso
+from VistaGeneral import VistaGeneral
+from Perfilado import medirTramo
 
 resultadosGenerarImagenes = []  # Lista para almacenar tiempos de generación de imágenes
+carpetaCacheFasta = ".cache_fasta"  # Carpeta donde se guardan las secuencias ya codificadas
+modoHeadless = False  # En modo headless no se abren ventanas ni se imprimen matrices
 
-# Función para leer un archivo en formato FASTA y concatenar todas las secuencias en una sola cadena
+# Función para activar el modo headless: backend Agg, sin ventanas y sin volcar matrices por consola
+def activarModoHeadless():
+    global modoHeadless
+    modoHeadless = True
+    plt.switch_backend("Agg")
+
+# Función para mostrar la figura actual, o sólo cerrarla en modo headless
+def mostrarFigura():
+    if modoHeadless:
+        plt.close()
+    else:
+        plt.show()
+
+# Función para imprimir una matriz con su título, salvo en modo headless
+def imprimirMatriz(titulo, matriz):
+    if not modoHeadless:
+        print(titulo)
+        print(matriz)
+
+# Función para leer un archivo FASTA línea a línea y concatenar todas sus secuencias como bytes uint8
+def leerFastaCodificado(nombreArchivo):
+    secuencia = bytearray()
+    dentroDeRegistro = False  # Lo que aparezca antes del primer encabezado no es secuencia
+    with open(nombreArchivo, "rb") as archivo:
+        for linea in archivo:
+            if linea.startswith(b">"):
+                dentroDeRegistro = True
+            elif dentroDeRegistro:
+                secuencia += linea.strip()
+    return np.frombuffer(secuencia, dtype=np.uint8)
+
+# Función para calcular la ruta en caché de un archivo FASTA a partir de su ruta, fecha de modificación y tamaño
+def rutaCacheFasta(nombreArchivo):
+    estado = os.stat(nombreArchivo)
+    clave = f"{os.path.abspath(nombreArchivo)}|{estado.st_mtime_ns}|{estado.st_size}"
+    return os.path.join(carpetaCacheFasta, hashlib.sha1(clave.encode()).hexdigest() + ".npy")
+
+# Función para leer un archivo en formato FASTA y concatenar todas las secuencias en un arreglo uint8 (un byte por base)
+# La primera lectura guarda la secuencia codificada en caché; las siguientes la abren como memmap sin volver a parsear
 def leerArchivoFasta(nombreArchivo):
-    secuencias = []
-    for record in SeqIO.parse(nombreArchivo, "fasta"):
-        secuencias.append(str(record.seq))
-    return "".join(secuencias)
+    rutaCache = rutaCacheFasta(nombreArchivo)
+    with medirTramo("carga", archivo=nombreArchivo, cache=os.path.exists(rutaCache)):
+        if not os.path.exists(rutaCache):
+            os.makedirs(carpetaCacheFasta, exist_ok=True)
+            rutaTemporal = f"{rutaCache}.{os.getpid()}.tmp"
+            with open(rutaTemporal, "wb") as archivo:
+                np.save(archivo, leerFastaCodificado(nombreArchivo))
+            os.replace(rutaTemporal, rutaCache)  # Reemplazo atómico: otro proceso nunca ve un archivo a medias
+        return np.load(rutaCache, mmap_mode="r")
 
 # Función para graficar un dotplot usando matplotlib
-def graficarDotplot(dotplot, figNombre='dotplot.svg'):
+# origen=(fila, columna) desplaza los ejes cuando el dotplot es una ventana de las secuencias completas
+def graficarDotplot(dotplot, figNombre='dotplot.svg', origen=(0, 0)):
     inicioGenerarImagenes = time.time()  # Marca el inicio del tiempo de generación de imágenes
-    plt.figure(figsize=(10, 10))
-    plt.imshow(dotplot, cmap="Greys", aspect="auto")
-    plt.xlabel("Secuencia 1")
-    plt.ylabel("Secuencia 2")
-    plt.savefig(figNombre)
+    os.makedirs(os.path.dirname(figNombre) or ".", exist_ok=True)  # Crear la carpeta de la imagen si no existe
+    with medirTramo("render", imagen=figNombre):
+        plt.figure(figsize=(10, 10))
+        if isinstance(dotplot, DotplotDisperso):
+            # Un dotplot disperso se dibuja completo como nube de puntos, sin pasar por una matriz densa
+            plt.scatter(dotplot.coincidencias[:, 1], dotplot.coincidencias[:, 0], s=0.5, c="black", marker=".")
+            plt.xlim(0, dotplot.shape[1])
+            plt.ylim(dotplot.shape[0], 0)  # Misma orientación que imshow: la fila 0 arriba
+        elif isinstance(dotplot, VistaGeneral):
+            # La vista general cubre toda la matriz: cada píxel es el máximo de un bloque de celdas
+            plt.imshow(dotplot.imagen, cmap="Greys", aspect="auto", interpolation="nearest",
+                       extent=(origen[1], origen[1] + dotplot.forma[1], origen[0] + dotplot.forma[0], origen[0]))
+        elif origen != (0, 0):
+            plt.imshow(dotplot, cmap="Greys", aspect="auto",
+                       extent=(origen[1], origen[1] + dotplot.shape[1], origen[0] + dotplot.shape[0], origen[0]))
+        else:
+            plt.imshow(dotplot, cmap="Greys", aspect="auto")
+        plt.xlabel("Secuencia 1")
+        plt.ylabel("Secuencia 2")
+        plt.savefig(figNombre)
     resultadosGenerarImagenes.append(f"Tiempo de generación de la imagen Dotplot: {time.time() - inicioGenerarImagenes}")
-    plt.show()
+    mostrarFigura()
     
 
 # Función para guardar una lista de resultados en un archivo de texto
@@ -42,6 +107,9 @@ def eficiencia(aceleraciones, numProcesadores):
 # Función para aplicar un filtro de convolución a una matriz y guardar la imagen resultante
 def aplicarFiltroConvolucion(matriz, pathImagen):
     inicioGenerarImagenes = time.time()  # Marca el inicio del tiempo de generación de imágenes
+
+    # Cargar sólo la región pedida (si la matriz es un memmap, se lee del disco en este momento)
+    matriz = np.ascontiguousarray(matriz)
     
     # Definir el kernel para detectar diagonales en la matriz
     kernelDiagonales = np.array([[1, -1, -1],
@@ -49,24 +117,20 @@ def aplicarFiltroConvolucion(matriz, pathImagen):
                                  [-1, -1, 1]])
     
     # Mostrar la matriz original
-    print("Matriz original")
-    print(matriz)
+    imprimirMatriz("Matriz original", matriz)
     
     # Aplicar el filtro de convolución usando el kernel definido
     filtered_matriz = cv2.filter2D(matriz, -1, kernelDiagonales)
-    print("Matriz filtrada")
-    print(filtered_matriz)
+    imprimirMatriz("Matriz filtrada", filtered_matriz)
 
     # Normalizar la matriz filtrada a un rango de 0 a 127
     matrizNormalizada = cv2.normalize(filtered_matriz, None, 0, 127, cv2.NORM_MINMAX)
-    print("Matriz normalizada")
-    print(matrizNormalizada)
+    imprimirMatriz("Matriz normalizada", matrizNormalizada)
 
     # Aplicar un umbral para binarizar la matriz normalizada
     valorDelUmbral = 70
     _, matrizBinaria = cv2.threshold(matrizNormalizada, valorDelUmbral, 255, cv2.THRESH_BINARY)
-    print("Matriz binarizada")
-    print(matrizBinaria)
+    imprimirMatriz("Matriz binarizada", matrizBinaria)
 
     # Guardar la matriz binarizada como una imagen
     cv2.imwrite(pathImagen, matrizBinaria)
@@ -74,8 +138,9 @@ def aplicarFiltroConvolucion(matriz, pathImagen):
     
     guardarResultadosArchivo(resultadosGenerarImagenes, nombreArchivo="ReporteTxt/tiempoDeGeneracionDeImagenesMultip.txt")
     
-    # Mostrar la imagen resultante
-    cv2.imshow('Diagonales', matrizBinaria)
-    cv2.waitKey(0)
-    cv2.destroyAllWindows()
+    # Mostrar la imagen resultante (en modo headless sólo queda guardada)
+    if not modoHeadless:
+        cv2.imshow('Diagonales', matrizBinaria)
+        cv2.waitKey(0)
+        cv2.destroyAllWindows()
     
@@ -0,0 +1,74 @@
+import numpy as np  # Importar numpy para operaciones numéricas
+
+tamanoVistaGeneral = 2000  # Número máximo de píxeles por lado de la vista general
+
+# Clase que acumula una vista general de todo el dotplot reduciendo cada bloque de celdas a su máximo (max-pooling)
+# Se alimenta tesela a tesela mientras se calcula el dotplot, así su costo de memoria no depende del tamaño de la matriz.
+# Con filas=(inicioFila, finFila) sólo cubre esa banda; los workers devuelven vistas parciales que se combinan después.
+class VistaGeneral:
+    def __init__(self, forma, tamano=tamanoVistaGeneral, filas=None):
+        self.forma = tuple(forma)
+        self.tamano = tamano
+        self.factorFila = max(1, -(-self.forma[0] // tamano))  # Filas del dotplot por píxel
+        self.factorColumna = max(1, -(-self.forma[1] // tamano))  # Columnas del dotplot por píxel
+        inicioFila, finFila = filas if filas is not None else (0, self.forma[0])
+        self.celdaInicio = inicioFila // self.factorFila
+        celdaFin = -(-finFila // self.factorFila)
+        self.imagen = np.zeros((max(celdaFin - self.celdaInicio, 0), -(-self.forma[1] // self.factorColumna)), dtype=np.uint8)
+
+    # Función para crear una vista vacía con la misma geometría que sólo cubre las filas [inicioFila, finFila)
+    def parcial(self, inicioFila, finFila):
+        return VistaGeneral(self.forma, self.tamano, (inicioFila, finFila))
+
+    # Función para reducir un bloque denso que empieza en (inicioFila, inicioColumna) y acumularlo en la imagen
+    def acumularBloque(self, bloque, inicioFila, inicioColumna):
+        if bloque.size == 0:
+            return
+        alto, ancho = bloque.shape
+        factorFila, factorColumna = self.factorFila, self.factorColumna
+
+        # Rellenar con ceros hasta los bordes de las celdas para poder reducir con reshape (sin bucles por celda)
+        antesFila, antesColumna = inicioFila % factorFila, inicioColumna % factorColumna
+        numFilas = -(-(antesFila + alto) // factorFila)
+        numColumnas = -(-(antesColumna + ancho) // factorColumna)
+        relleno = np.zeros((numFilas * factorFila, numColumnas * factorColumna), dtype=np.uint8)
+        relleno[antesFila:antesFila + alto, antesColumna:antesColumna + ancho] = bloque
+
+        reducido = relleno.reshape(numFilas, factorFila, -1).max(axis=1).reshape(numFilas, numColumnas, factorColumna)
+        if factorColumna < 16:
+            # Con pocas columnas por píxel es más rápido combinar las factorColumna rebanadas que reducir el eje interno
+            columnas = reducido[:, :, 0].copy()
+            for k in range(1, factorColumna):
+                np.maximum(columnas, reducido[:, :, k], out=columnas)
+            reducido = columnas
+        else:
+            reducido = reducido.max(axis=2)
+
+        filas = slice(inicioFila // factorFila - self.celdaInicio, inicioFila // factorFila - self.celdaInicio + numFilas)
+        columnas = slice(inicioColumna // factorColumna, inicioColumna // factorColumna + numColumnas)
+        np.maximum(self.imagen[filas, columnas], reducido, out=self.imagen[filas, columnas])
+
+    # Función para acumular coincidencias dispersas (i, j) como las del modo k-mer
+    def acumularCoincidencias(self, coincidencias):
+        if len(coincidencias) == 0:
+            return
+        filas, columnas = coincidencias[:, 0], coincidencias[:, 1]
+        valores = np.where(filas == columnas, 2, 1).astype(np.uint8)
+        np.maximum.at(self.imagen, (filas // self.factorFila - self.celdaInicio, columnas // self.factorColumna), valores)
+
+    # Función para combinar en esta vista otra vista (parcial o completa) con la misma geometría
+    def combinar(self, otra):
+        filas = slice(otra.celdaInicio - self.celdaInicio, otra.celdaInicio - self.celdaInicio + otra.imagen.shape[0])
+        np.maximum(self.imagen[filas], otra.imagen, out=self.imagen[filas])
+
+# Función para construir la vista general de un dotplot ya calculado (denso, memmap, empaquetado o disperso)
+# Recorre la matriz por bandas de filas para no cargarla completa en memoria
+def generarVistaGeneral(dotplot, tamano=tamanoVistaGeneral):
+    vista = VistaGeneral(dotplot.shape, tamano)
+    if hasattr(dotplot, "coincidencias"):
+        vista.acumularCoincidencias(dotplot.coincidencias)
+        return vista
+    filasPorBanda = max(1, (64 * 2**20) // max(dotplot.shape[1], 1))  # Bandas de unos 64 MB; no hace falta alinearlas a las celdas
+    for inicio in range(0, dotplot.shape[0], filasPorBanda):
+        vista.acumularBloque(dotplot[inicio:inicio + filasPorBanda, :], inicio, 0)
+    return vista